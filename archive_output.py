@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import tarfile
+import time
+import zipfile
+
+ARCHIVE_SUFFIXES = [
+    ('.tar.gz', 'tar.gz'),
+    ('.tgz', 'tar.gz'),
+    ('.zip', 'zip'),
+    ('.jsonl', 'jsonl'),
+]
+
+
+def _as_bytes(content):
+    """Documents are added as str or as UTF-8 encoded bytes"""
+    return content.encode('utf-8') if isinstance(content, str) else content
+
+
+def archive_type(path):
+    """Return the archive type implied by an output path's suffix, or None"""
+    lower = path.lower()
+    for suffix, kind in ARCHIVE_SUFFIXES:
+        if lower.endswith(suffix):
+            return kind
+    return None
+
+
+def archive_path(path, kind):
+    """Append the suffix for kind unless path already has a matching one"""
+    if archive_type(path) == kind:
+        return path
+    return path + '.' + kind
+
+
+class ZipBundle:
+    """Write documents into a deflated .zip archive"""
+
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+
+    def add_folder(self, path):
+        self.archive.writestr(path + '/', b'')
+
+    def add(self, path, content):
+        self.archive.writestr(path, _as_bytes(content))
+
+    def close(self):
+        self.archive.close()
+
+
+class TarBundle:
+    """Write documents into a gzip compressed tarball"""
+
+    def __init__(self, path):
+        self.archive = tarfile.open(path, 'w:gz')
+        self.mtime = time.time()
+
+    def add_folder(self, path):
+        info = tarfile.TarInfo(path)
+        info.type = tarfile.DIRTYPE
+        info.mode = 0o755
+        info.mtime = self.mtime
+        self.archive.addfile(info)
+
+    def add(self, path, content):
+        data = _as_bytes(content)
+        info = tarfile.TarInfo(path)
+        info.size = len(data)
+        info.mode = 0o644
+        info.mtime = self.mtime
+        self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+
+
+class JsonlBundle:
+    """Write one JSON record per document: its path, format and content"""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8', newline='\n')
+
+    def add_folder(self, path):
+        pass
+
+    def add(self, path, content):
+        record = {
+            'path': path,
+            'format': os.path.splitext(path)[1][1:],
+            'content': content.decode('utf-8') if isinstance(content, bytes) else content,
+        }
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+BUNDLES = {
+    'zip': ZipBundle,
+    'tar.gz': TarBundle,
+    'jsonl': JsonlBundle,
+}
+
+
+def open_bundle(path, kind):
+    """Create the archive at path, making its parent directory if needed"""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    return BUNDLES[kind](path)
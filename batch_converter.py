@@ -0,0 +1,183 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from converter_core import convert_collection
+from single_format_converter import parse_formats
+
+COLLECTION_SUFFIXES = ['.postman_collection.json', '.json']
+
+
+def find_collections(sources):
+    """Expand directories and glob patterns into a sorted list of collection files"""
+    files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            files.update(glob.glob(os.path.join(source, '*.json')))
+        else:
+            files.update(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    return sorted(files)
+
+
+def output_roots(collection_files, output_dir):
+    """Give every collection its own output directory named after the file"""
+    roots = {}
+    used = set()
+    for collection_file in collection_files:
+        stem = os.path.basename(collection_file)
+        for suffix in COLLECTION_SUFFIXES:
+            if stem.lower().endswith(suffix):
+                stem = stem[:-len(suffix)]
+                break
+        name = stem
+        counter = 2
+        while name.lower() in used:
+            name = f"{stem}-{counter}"
+            counter += 1
+        used.add(name.lower())
+        roots[collection_file] = os.path.join(output_dir, name)
+    return roots
+
+
+def convert_one(collection_file, output_root, formats, options):
+    """Convert a single collection in a worker process and summarise the run"""
+    output = io.StringIO()
+    crash = None
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            success = convert_collection(collection_file, output_root, formats, **options)
+    except Exception as e:
+        success = False
+        crash = f"Error: {e.__class__.__name__}: {str(e)}"
+        output.write(traceback.format_exc())
+    seconds = time.perf_counter() - start
+
+    lines = output.getvalue().splitlines()
+    errors = [line for line in lines if line.startswith('Error')]
+    if crash is not None:
+        errors.append(crash)
+    return {
+        'collection': collection_file,
+        'output': output_root,
+        'success': success,
+        'seconds': round(seconds, 3),
+        'saved': sum(1 for line in lines if line.startswith('Saved ')),
+        'errors': errors,
+        'log': lines if not success else [],
+    }
+
+
+def convert_batch(collection_files, output_dir, formats, options=None, workers=None, log=print):
+    """Convert collections on a process pool, one collection per worker
+
+    A collection that fails to convert is reported and does not stop the
+    others. Returns the per-collection results in input order.
+    """
+    options = options or {}
+    roots = output_roots(collection_files, output_dir)
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(convert_one, collection_file, roots[collection_file], formats, options): collection_file
+            for collection_file in collection_files
+        }
+        for future in as_completed(futures):
+            collection_file = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died, e.g. it was killed or ran out of memory
+                result = {
+                    'collection': collection_file,
+                    'output': roots[collection_file],
+                    'success': False,
+                    'seconds': 0.0,
+                    'saved': 0,
+                    'errors': [f"Error: worker failed: {str(e)}"],
+                    'log': [],
+                }
+            status = "ok" if result['success'] else "FAILED"
+            log(f"[{len(results) + 1}/{len(collection_files)}] {status}: {collection_file} ({result['seconds']:.2f}s)")
+            results[collection_file] = result
+    return [results[collection_file] for collection_file in collection_files]
+
+
+def print_summary(results, wall_seconds, log=print):
+    width = max([len(os.path.basename(r['collection'])) for r in results] + [10])
+    log("-" * 50)
+    log(f"{'Collection':<{width}}  {'Status':<6}  {'Time':>8}  {'Saved':>7}  {'Errors':>6}")
+    for result in results:
+        status = "ok" if result['success'] else "FAILED"
+        log(f"{os.path.basename(result['collection']):<{width}}  {status:<6}  "
+            f"{result['seconds']:>7.2f}s  {result['saved']:>7}  {len(result['errors']):>6}")
+
+    failed = [r for r in results if not r['success']]
+    for result in failed:
+        log("")
+        log(f"Failed: {result['collection']}")
+        for line in (result['errors'] or result['log'])[-5:]:
+            log(f"  {line}")
+
+    log("-" * 50)
+    log(f"Total: {len(results)} collections, {len(results) - len(failed)} succeeded, {len(failed)} failed, "
+        f"{sum(r['saved'] for r in results)} files saved, "
+        f"{sum(r['seconds'] for r in results):.2f}s of work in {wall_seconds:.2f}s")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Convert a directory or glob of Postman collections on several processes")
+    parser.add_argument('sources', nargs='+', help="Collection files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', default="./output",
+                        help="Root directory; each collection gets a sub folder named after its file")
+    parser.add_argument('-f', '--format', default="txt", help="txt, json, md, a comma separated list or 'all'")
+    parser.add_argument('-w', '--workers', type=int, help="Worker processes (default: number of CPUs)")
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--jobs', type=int, default=1, help="Writer threads per collection")
+    parser.add_argument('--incremental', action='store_true')
+    parser.add_argument('--prune', action='store_true')
+    parser.add_argument('--archive', choices=['zip', 'tar.gz', 'jsonl'])
+    parser.add_argument('--summary', help="Also write the summary as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    collection_files = find_collections(args.sources)
+    if not collection_files:
+        print("Error: No collection files found.")
+        return False
+
+    formats = parse_formats(args.format)
+    options = {
+        'stream': args.stream,
+        'jobs': args.jobs,
+        'incremental': args.incremental,
+        'prune': args.prune,
+        'archive': args.archive,
+    }
+    print(f"Converting {len(collection_files)} collections to '{args.output_dir}'")
+    print(f"Format: {', '.join(formats)}")
+    print("-" * 50)
+
+    start = time.perf_counter()
+    results = convert_batch(collection_files, args.output_dir, formats, options, args.workers)
+    wall_seconds = time.perf_counter() - start
+    print_summary(results, wall_seconds)
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump({'wall_seconds': round(wall_seconds, 3), 'results': results}, f, indent=2)
+    return all(result['success'] for result in results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
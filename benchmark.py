@@ -0,0 +1,217 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESULTS_VERSION = 1
+FORMATS = ['txt', 'json', 'md']
+
+# name: (depth, fanout, requests per folder, headers, body size)
+CASES = {
+    'small': (2, 5, 5, 4, 256),
+    'wide': (2, 40, 10, 6, 512),
+    'large': (3, 20, 10, 6, 512),
+    'deep': (60, 1, 2, 4, 256),
+    'many-headers': (1, 10, 20, 200, 256),
+    'large-bodies': (1, 2, 4, 4, 5 * 1024 * 1024),
+}
+
+
+def generate_collection(depth, fanout, requests, headers, body_size, seed=0):
+    """Build a synthetic Postman collection
+
+    Every folder holds `requests` requests and, above the bottom level,
+    `fanout` sub folders. Returns the collection with its folder and request
+    counts.
+    """
+    rng = random.Random(seed)
+    counts = {'folders': 0, 'requests': 0}
+
+    def make_request(path, index):
+        counts['requests'] += 1
+        filler = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(32))
+        raw = json.dumps({'id': index, 'path': path, 'data': (filler * (body_size // 32 + 1))[:body_size]})
+        return {
+            'name': f"Request {index}",
+            'request': {
+                'method': rng.choice(['GET', 'POST', 'PUT', 'PATCH', 'DELETE']),
+                'header': [{'key': f"X-Header-{h}", 'value': f"value-{h}-{filler[:8]}"} for h in range(headers)],
+                'body': {'mode': 'raw', 'raw': raw},
+                'url': {'raw': f"{{{{baseUrl}}}}/{path}/{index}"},
+                'description': f"Synthetic request {index} in {path or 'root'}",
+            },
+            'response': [],
+        }
+
+    def make_items(level, path):
+        items = [make_request(path, index) for index in range(requests)]
+        if level < depth:
+            for index in range(fanout):
+                counts['folders'] += 1
+                name = f"F{level}-{index}"
+                items.append({
+                    'name': name,
+                    'item': make_items(level + 1, f"{path}/{name}" if path else name),
+                })
+        return items
+
+    collection = {
+        'info': {
+            'name': 'Benchmark Collection',
+            'schema': 'https://schema.getpostman.com/json/collection/v2.1.0/collection.json',
+        },
+        'item': make_items(1, ''),
+    }
+    return collection, counts['folders'], counts['requests']
+
+
+def _peak_memory_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _run_case(collection_file, output_dir, format_type, options):
+    """Convert one collection in a fresh process and time it"""
+    from converter_core import convert_collection
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        success = convert_collection(collection_file, output_dir, format_type, **options)
+        seconds = time.perf_counter() - start
+    return success, seconds, _peak_memory_kb()
+
+
+def _output_size(path):
+    files = 0
+    size = 0
+    if os.path.isfile(path):
+        return 1, os.path.getsize(path)
+    for folder, _, filenames in os.walk(path):
+        for filename in filenames:
+            files += 1
+            size += os.path.getsize(os.path.join(folder, filename))
+    return files, size
+
+
+def run_benchmarks(cases, formats=FORMATS, options=None, repeat=1, log=print):
+    """Run every case in every format and return the result records"""
+    options = options or {}
+    spawn = multiprocessing.get_context('spawn')
+    results = []
+    with tempfile.TemporaryDirectory(prefix='postman-bench-') as workdir:
+        for case, params in cases.items():
+            collection, folders, requests = generate_collection(*params)
+            collection_file = os.path.join(workdir, f"{case}.json")
+            with open(collection_file, 'w', encoding='utf-8') as f:
+                json.dump(collection, f, indent=2)
+            del collection
+            input_bytes = os.path.getsize(collection_file)
+
+            for format_type in formats:
+                best = None
+                for run in range(repeat):
+                    output = os.path.join(workdir, f"{case}-{format_type}-{run}")
+                    if options.get('archive'):
+                        output += '.' + options['archive']
+                    # A fresh process per run; ProcessPoolExecutor only takes mp_context from 3.7
+                    with spawn.Pool(1) as pool:
+                        success, seconds, peak_kb = pool.apply(
+                            _run_case, (collection_file, output, format_type, options))
+                    files, size = _output_size(output)
+                    if best is None or seconds < best['seconds']:
+                        best = {
+                            'case': case,
+                            'format': format_type,
+                            'params': dict(zip(['depth', 'fanout', 'requests', 'headers', 'body_size'], params)),
+                            'success': success,
+                            'folders': folders,
+                            'requests': requests,
+                            'input_bytes': input_bytes,
+                            'seconds': round(seconds, 4),
+                            'items_per_sec': round((folders + requests) / seconds, 1) if seconds else None,
+                            'peak_rss_kb': peak_kb,
+                            'files_written': files,
+                            'bytes_written': size,
+                        }
+                log(f"{case:>14} {format_type:>4}: {best['seconds']:8.3f}s "
+                    f"{best['items_per_sec'] or 0:>10.0f} items/s "
+                    f"{best['peak_rss_kb'] or 0:>8} KB peak, {best['files_written']} files")
+                results.append(best)
+    return results
+
+
+def compare_results(current, baseline, log=print):
+    """Print time and memory ratios against a previous results file"""
+    previous = {(r['case'], r['format']): r for r in baseline.get('results', [])}
+    log("")
+    log(f"{'case':>14} {'fmt':>4} {'time':>8} {'memory':>8}")
+    for result in current:
+        old = previous.get((result['case'], result['format']))
+        if old is None:
+            continue
+        time_ratio = result['seconds'] / old['seconds'] if old['seconds'] else float('nan')
+        if result['peak_rss_kb'] and old.get('peak_rss_kb'):
+            memory = f"{result['peak_rss_kb'] / old['peak_rss_kb']:7.2f}x"
+        else:
+            memory = f"{'n/a':>8}"
+        log(f"{result['case']:>14} {result['format']:>4} {time_ratio:7.2f}x {memory}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the Postman collection converter on synthetic collections")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), help="Built in cases to run (default: all)")
+    parser.add_argument('--custom', nargs=5, type=int, metavar=('DEPTH', 'FANOUT', 'REQUESTS', 'HEADERS', 'BODY_SIZE'),
+                        help="Run a custom shape instead of the built in cases")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per case, the fastest is kept")
+    parser.add_argument('--stream', action='store_true', help="Pass --stream to the converter")
+    parser.add_argument('--jobs', type=int, default=1, help="Pass --jobs to the converter")
+    parser.add_argument('--archive', choices=['zip', 'tar.gz', 'jsonl'], help="Pass --archive to the converter")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--compare', help="Compare against a results file from an earlier run")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    if args.custom:
+        cases = {'custom': tuple(args.custom)}
+    else:
+        cases = {name: CASES[name] for name in (args.cases or CASES)}
+    options = {'stream': args.stream, 'jobs': args.jobs, 'archive': args.archive}
+
+    results = run_benchmarks(cases, args.formats, options, args.repeat)
+    report = {
+        'version': RESULTS_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': options,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_results(results, json.load(f))
+    return all(result['success'] for result in results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
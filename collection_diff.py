@@ -0,0 +1,355 @@
+import argparse
+import hashlib
+import json
+import sys
+from collections import namedtuple
+
+from converter_core import FORMATS, build_record, open_collection
+from write_plan import WritePlanner
+
+DIFF_FORMATS = ['md', 'txt', 'json']
+
+# field is 'method', 'url', 'header', 'body', 'description' or 'other'. For
+# headers and body fields key is the name and old or new is None when it was
+# added or removed.
+Change = namedtuple('Change', ['field', 'key', 'old', 'new'])
+Endpoint = namedtuple('Endpoint', ['path', 'method', 'url'])
+Moved = namedtuple('Moved', ['old_path', 'path', 'method', 'url'])
+Changed = namedtuple('Changed', ['path', 'method', 'url', 'changes'])
+
+
+def _digest(*parts):
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _source(item, skip):
+    return json.dumps({key: value for key, value in item.items() if key not in skip},
+                      sort_keys=True, separators=(',', ':'))
+
+
+class Node:
+    """A folder or request of a collection with the hash of everything below it
+
+    A request's digest covers its item except the name, which is part of
+    its path instead, so a moved or renamed request keeps its digest. A
+    folder's digest covers its own fields and the names and digests of its
+    children in sorted order, so reordering items is not a change.
+    """
+    __slots__ = ('kind', 'path', 'item', 'own', 'digest', 'children', 'requests')
+
+    def __init__(self, kind, path, item=None):
+        self.kind = kind
+        self.path = path
+        self.item = item
+        self.own = _digest(_source(item or {}, ('name', 'item')))
+        self.digest = self.own if kind == 'request' else None
+        self.children = {}  # (kind, planned name) -> Node
+        self.requests = 1 if kind == 'request' else 0
+
+    def finish(self):
+        """Compute the digests of this folder and every folder below it"""
+        parts = [self.own]
+        for (kind, name), child in sorted(self.children.items()):
+            if child.kind == 'folder':
+                child.finish()
+            self.requests += child.requests
+            parts.extend((kind, name, child.digest))
+        self.digest = _digest(*parts)
+
+
+def build_tree(entries):
+    """Build the Node tree of a collection from its (kind, parents, name, item) entries
+
+    Names are planned as they are for the output files, so paths in the
+    diff are those of the converted documents.
+    """
+    root = Node('folder', '')
+    folders = {(): root}
+    for kind, parents, name, item in WritePlanner(FORMATS).plan_entries(entries):
+        parent = folders[parents]
+        path = '/'.join(parents + (name,))
+        node = parent.children.get((kind, name))
+        if node is None:
+            node = parent.children[(kind, name)] = Node(kind, path, item)
+        if kind == 'folder':
+            folders[parents + (name,)] = node
+    root.finish()
+    return root
+
+
+def load_tree(collection_file, stream=False):
+    """Return the collection name and Node tree of a collection file"""
+    collection_name, entries = open_collection(collection_file, stream)
+    return collection_name, build_tree(entries)
+
+
+def _endpoint(node):
+    record = build_record(node.item, node.path, keep_item=False)
+    if record.error is not None or not record.has_request:
+        return Endpoint(node.path, None, None)
+    return Endpoint(node.path, str(record.method), str(record.url))
+
+
+def _pair_changes(field, old_pairs, new_pairs):
+    old = {str(key): value for key, value in old_pairs}
+    new = {str(key): value for key, value in new_pairs}
+    changes = []
+    for key, value in new.items():
+        if key not in old:
+            changes.append(Change(field, key, None, value))
+        elif old[key] != value:
+            changes.append(Change(field, key, old[key], value))
+    for key, value in old.items():
+        if key not in new:
+            changes.append(Change(field, key, value, None))
+    return changes
+
+
+def _size(text):
+    return f"{len(text)} characters" if isinstance(text, str) else str(text)
+
+
+def request_changes(old_item, new_item):
+    """Return the list of Changes between two versions of a request item"""
+    old = build_record(old_item, '', keep_item=False)
+    new = build_record(new_item, '', keep_item=False)
+    if old.error is not None or new.error is not None or old.has_request != new.has_request:
+        return [Change('other', None, None, None)]
+    changes = []
+    if old.method != new.method:
+        changes.append(Change('method', None, old.method, new.method))
+    if old.url != new.url:
+        changes.append(Change('url', None, old.url, new.url))
+    changes.extend(_pair_changes('header', old.headers, new.headers))
+
+    if old.body_mode != new.body_mode:
+        changes.append(Change('body', 'mode', old.body_mode, new.body_mode))
+    elif old.body_raw != new.body_raw:
+        changes.append(Change('body', 'raw', _size(old.body_raw), _size(new.body_raw)))
+    elif old.body_fields != new.body_fields:
+        changes.extend(_pair_changes('body', ((key, value) for key, value, _ in old.body_fields or ()),
+                                     ((key, value) for key, value, _ in new.body_fields or ())))
+    elif old.body_graphql != new.body_graphql:
+        for key, old_value, new_value in zip(('query', 'variables'), old.body_graphql or ('', ''),
+                                             new.body_graphql or ('', '')):
+            if old_value != new_value:
+                changes.append(Change('body', key, _size(old_value), _size(new_value)))
+    elif old.body_file != new.body_file:
+        changes.append(Change('body', 'file', old.body_file, new.body_file))
+
+    if old.description != new.description:
+        changes.append(Change('description', None, None, None))
+    if not changes:
+        # Scripts, auth, saved examples and the like
+        changes.append(Change('other', None, None, None))
+    return changes
+
+
+class CollectionDiff:
+    """The endpoint level differences between two collection trees
+
+    Subtrees with equal digests are skipped without looking inside, so the
+    work grows with the size of the changes rather than of the collections.
+    Requests that were removed in one place and added with the same digest
+    in another are reported as moved.
+    """
+
+    def __init__(self, old_name, old_root, new_name, new_root):
+        self.old_name = old_name
+        self.new_name = new_name
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.moved = []
+        self.unchanged = 0
+        self.old_requests = old_root.requests
+        self.new_requests = new_root.requests
+        self._added = []
+        self._removed = []
+        self._compare(old_root, new_root)
+        self._match_moves()
+
+    def _compare(self, old, new):
+        if old.digest == new.digest:
+            self.unchanged += new.requests
+            return
+        for key, new_child in new.children.items():
+            old_child = old.children.get(key)
+            if old_child is None:
+                self._collect(new_child, self._added)
+            elif new_child.kind == 'folder':
+                self._compare(old_child, new_child)
+            elif old_child.digest == new_child.digest:
+                self.unchanged += 1
+            else:
+                endpoint = _endpoint(new_child)
+                self.changed.append(Changed(endpoint.path, endpoint.method, endpoint.url,
+                                            request_changes(old_child.item, new_child.item)))
+        for key, old_child in old.children.items():
+            if key not in new.children:
+                self._collect(old_child, self._removed)
+
+    def _collect(self, node, nodes):
+        if node.kind == 'request':
+            nodes.append(node)
+        else:
+            for child in node.children.values():
+                self._collect(child, nodes)
+
+    def _match_moves(self):
+        removed = {}
+        for node in self._removed:
+            removed.setdefault(node.digest, []).append(node)
+        for node in self._added:
+            candidates = removed.get(node.digest)
+            endpoint = _endpoint(node)
+            if candidates:
+                self.moved.append(Moved(candidates.pop(0).path, *endpoint))
+            else:
+                self.added.append(endpoint)
+        for nodes in removed.values():
+            self.removed.extend(_endpoint(node) for node in nodes)
+        self.removed.sort()
+        self._added = self._removed = None
+
+    @property
+    def has_changes(self):
+        return bool(self.added or self.removed or self.changed or self.moved)
+
+    def summary(self):
+        return (f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed, "
+                f"{len(self.moved)} moved, {self.unchanged} unchanged")
+
+    def as_dict(self):
+        return {
+            'old': {'name': self.old_name, 'requests': self.old_requests},
+            'new': {'name': self.new_name, 'requests': self.new_requests},
+            'summary': {'added': len(self.added), 'removed': len(self.removed), 'changed': len(self.changed),
+                        'moved': len(self.moved), 'unchanged': self.unchanged},
+            'added': [endpoint._asdict() for endpoint in self.added],
+            'removed': [endpoint._asdict() for endpoint in self.removed],
+            'changed': [dict(path=entry.path, method=entry.method, url=entry.url,
+                             changes=[change._asdict() for change in entry.changes])
+                        for entry in self.changed],
+            'moved': [moved._asdict() for moved in self.moved],
+        }
+
+
+def describe_change(change, quote=str):
+    """One line describing a Change; quote formats the values"""
+    field, key, old, new = change
+    if field in ('method', 'url'):
+        return f"{'Method' if field == 'method' else 'URL'}: {quote(old)} -> {quote(new)}"
+    if field == 'description':
+        return "Description changed"
+    if field == 'other':
+        return "Other settings changed (scripts, auth, examples)"
+    label = 'Header' if field == 'header' else 'Body field'
+    if field == 'body' and key in ('mode', 'raw', 'query', 'variables', 'file'):
+        label = {'mode': 'Body mode', 'raw': 'Body', 'query': 'GraphQL query',
+                 'variables': 'GraphQL variables', 'file': 'Body file'}[key]
+        return f"{label}: {quote(old)} -> {quote(new)}"
+    if old is None:
+        return f"{label} added: {quote(key)} = {quote(new)}"
+    if new is None:
+        return f"{label} removed: {quote(key)}"
+    return f"{label} changed: {quote(key)}: {quote(old)} -> {quote(new)}"
+
+
+def _endpoint_text(entry, quote=str):
+    if entry.method is None:
+        return quote(entry.path)
+    return f"{quote(f'{entry.method} {entry.url}')} ({entry.path})"
+
+
+def render_changelog_md(diff):
+    def code(value):
+        return f"`{value}`"
+
+    lines = [f"# Changelog: {diff.old_name} -> {diff.new_name}", "", diff.summary()]
+    sections = [("Added", diff.added), ("Removed", diff.removed)]
+    for title, endpoints in sections:
+        if endpoints:
+            lines.extend(["", f"## {title}", ""])
+            lines.extend(f"- {_endpoint_text(endpoint, code)}" for endpoint in endpoints)
+    if diff.changed:
+        lines.extend(["", "## Changed"])
+        for entry in diff.changed:
+            lines.extend(["", f"### {entry.path}", ""])
+            if entry.method is not None:
+                lines.extend([code(f"{entry.method} {entry.url}"), ""])
+            lines.extend(f"- {describe_change(change, code)}" for change in entry.changes)
+    if diff.moved:
+        lines.extend(["", "## Moved", ""])
+        lines.extend(f"- {code(moved.old_path)} -> {code(moved.path)}" for moved in diff.moved)
+    return '\n'.join(lines) + '\n'
+
+
+def render_changelog_txt(diff):
+    lines = [f"Changelog: {diff.old_name} -> {diff.new_name}", diff.summary()]
+    for title, endpoints in [("ADDED", diff.added), ("REMOVED", diff.removed)]:
+        if endpoints:
+            lines.extend(["", f"{title}:"])
+            lines.extend(f"  {_endpoint_text(endpoint)}" for endpoint in endpoints)
+    if diff.changed:
+        lines.extend(["", "CHANGED:"])
+        for entry in diff.changed:
+            lines.append(f"  {_endpoint_text(entry)}")
+            lines.extend(f"    {describe_change(change)}" for change in entry.changes)
+    if diff.moved:
+        lines.extend(["", "MOVED:"])
+        lines.extend(f"  {moved.old_path} -> {moved.path}" for moved in diff.moved)
+    return '\n'.join(lines) + '\n'
+
+
+def render_changelog_json(diff):
+    return json.dumps(diff.as_dict(), indent=2, ensure_ascii=False) + '\n'
+
+
+CHANGELOG_RENDERERS = {
+    'md': render_changelog_md,
+    'txt': render_changelog_txt,
+    'json': render_changelog_json,
+}
+
+
+def diff_collections(old_file, new_file, stream=False):
+    """Compare two collection files and return their CollectionDiff"""
+    old_name, old_root = load_tree(old_file, stream)
+    new_name, new_root = load_tree(new_file, stream)
+    return CollectionDiff(old_name, old_root, new_name, new_root)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="List the endpoints added, removed or changed between two "
+                                                 "versions of a Postman collection")
+    parser.add_argument('old', help="Earlier collection file")
+    parser.add_argument('new', help="Later collection file")
+    parser.add_argument('--format', choices=DIFF_FORMATS, default='md', help="Changelog format (default: md)")
+    parser.add_argument('--output', help="Write the changelog to this file instead of stdout")
+    parser.add_argument('--stream', action='store_true', help="Parse the collections incrementally")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    try:
+        diff = diff_collections(args.old, args.new, args.stream)
+    except FileNotFoundError as e:
+        print(f"Error: Collection file '{e.filename}' not found.", file=sys.stderr)
+        return False
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON in collection file: {str(e)}", file=sys.stderr)
+        return False
+    changelog = CHANGELOG_RENDERERS[args.format](diff)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(changelog)
+        print(diff.summary())
+    else:
+        sys.stdout.write(changelog)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
@@ -0,0 +1,198 @@
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# What may follow a number that is cut off by the end of the window ("1." or "1.5e")
+NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*\Z')
+
+
+class JsonStream:
+    """Minimal pull reader over a JSON text file.
+
+    Keeps only a sliding window of the file in memory. Structural tokens are
+    consumed one at a time and complete values are decoded with the standard
+    json decoder, growing the window only as far as that value needs.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, size):
+        """Append up to size characters to the window, dropping consumed text"""
+        if self.eof:
+            return False
+        data = self.f.read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill(self.chunk_size):
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise self.error(f"Expecting '{char}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode and return the next complete JSON value"""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill(size):
+                    raise
+                size *= 2
+                continue
+            # A number at the end of the window may continue in the next chunk;
+            # the decoder returns the prefix it could read ("1" of "1.")
+            if (isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                    and NUMBER_TAIL.match(self.buf, end) and self.fill(size)):
+                continue
+            if end == len(self.buf) and self.fill(size):
+                continue
+            self.pos = end
+            return obj
+
+    def separator(self, close):
+        """Consume ',' or the closing bracket; return True if more members follow"""
+        char = self.peek()
+        if char == ',':
+            self.pos += 1
+            return True
+        if char == close:
+            self.pos += 1
+            return False
+        raise self.error(f"Expecting ',' delimiter or '{close}'")
+
+    def error(self, message):
+        return json.JSONDecodeError(message, self.buf, self.pos)
+
+
+def read_items(stream):
+    """Yield events for an ``item`` array positioned at its opening bracket"""
+    stream.expect('[')
+    if stream.peek() == ']':
+        stream.pos += 1
+        return
+    while True:
+        yield from read_item(stream)
+        if not stream.separator(']'):
+            return
+
+
+def read_item(stream):
+    """Yield events for one folder or request object.
+
+    Requests are decoded completely. Folders are emitted as soon as their
+    name is known and their children are streamed; if ``item`` comes before
+    ``name`` the children have to be buffered until the name is seen.
+    """
+    stream.expect('{')
+    fields = {}
+    children = None
+    streamed = False
+    if stream.peek() == '}':
+        stream.pos += 1
+    else:
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            if key == 'item' and not streamed and children is None:
+                if 'name' in fields and stream.peek() == '[':
+                    yield 'folder', fields
+                    yield from read_items(stream)
+                    yield 'end', None
+                    streamed = True
+                else:
+                    children = stream.value()
+            elif streamed or key == 'item':
+                stream.value()
+            else:
+                fields[key] = stream.value()
+            if not stream.separator('}'):
+                break
+
+    if streamed:
+        return
+    if children is not None:
+        fields['item'] = children
+        yield 'folder', fields
+        for child in children:
+            yield from replay_item(child)
+        yield 'end', None
+    else:
+        yield 'request', fields
+
+
+def replay_item(item):
+    """Yield the same events as read_item for an already decoded item"""
+    if 'item' in item:
+        yield 'folder', item
+        for child in item['item']:
+            yield from replay_item(child)
+        yield 'end', None
+    else:
+        yield 'request', item
+
+
+def read_collection(f, chunk_size=CHUNK_SIZE):
+    """Stream a Postman collection file as a sequence of (kind, value) events.
+
+    The first event is ('collection', name). It is followed by ('folder', item)
+    and ('end', None) pairs around each folder's children and a
+    ('request', item) event for every request, in document order. Folder items
+    carry their own fields but not their children. A collection-level
+    variable block is yielded last as ('variable', values).
+    """
+    stream = JsonStream(f, chunk_size)
+    stream.expect('{')
+    info = None
+    pending = None
+    variables = None
+    started = False
+    if stream.peek() == '}':
+        stream.pos += 1
+    else:
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            if key == 'info' and not started:
+                info = stream.value()
+            elif key == 'item' and not started and info is not None and stream.peek() == '[':
+                yield 'collection', info.get('name', 'PostmanCollection')
+                started = True
+                yield from read_items(stream)
+            elif key == 'item' and not started:
+                pending = stream.value()
+            elif key == 'variable':
+                variables = stream.value()
+            else:
+                stream.value()
+            if not stream.separator('}'):
+                break
+
+    if not started:
+        yield 'collection', (info or {}).get('name', 'PostmanCollection')
+        if pending is not None:
+            for item in pending:
+                yield from replay_item(item)
+    if variables is not None:
+        yield 'variable', variables
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+
+from content_store import ContentStore, has_store
+from converter_core import SIDECAR_FORMATS, as_formats, iter_items, sanitize_name, write_entries
+from write_plan import compile_plan
+
+
+class CollectionWatcher:
+    """Keep an output directory in sync with a collection file that keeps changing
+
+    The last parsed collection stays in memory. When the file changes, the
+    new item tree is compared with the old one request by request, keyed by
+    planned output path. Only added or changed requests are written again,
+    and files of removed requests are deleted. The file is polled because the
+    standard library has no portable file notification API. A change is
+    only acted on once the file has stopped changing for `debounce` seconds,
+    so a burst of saves triggers one sync.
+    """
+
+    def __init__(self, collection_file, output_dir, format_type, interval=1.0, debounce=0.5,
+                 jobs=1, log=print, body_options=None, dedup=None):
+        self.collection_file = collection_file
+        self.output_dir = output_dir
+        self.formats = as_formats(format_type)
+        self.interval = interval
+        self.debounce = debounce
+        self.jobs = jobs
+        self.log = log
+        self.body_options = body_options
+        if not dedup and has_store(output_dir):
+            dedup = 'hard'
+        self.store = ContentStore(output_dir, dedup) if dedup else None
+        self.root_dir = None
+        self.requests = {}  # (planned parents, planned name) -> source item
+        self.syncs = 0
+
+    def signature(self):
+        try:
+            info = os.stat(self.collection_file)
+        except OSError:
+            return None
+        return info.st_mtime_ns, info.st_size
+
+    def sync(self):
+        """Bring the output up to date with the collection file
+
+        Returns (added, changed, removed) request counts.
+        """
+        started = time.perf_counter()
+        with open(self.collection_file, 'r', encoding='utf-8') as f:
+            collection = json.load(f)
+        collection_name = collection.get('info', {}).get('name', 'PostmanCollection')
+        root_dir = os.path.join(self.output_dir, sanitize_name(collection_name))
+        if root_dir != self.root_dir:
+            # First sync, or the collection was renamed: start from scratch
+            self.root_dir = root_dir
+            self.requests = {}
+
+        entries = list(iter_items(collection.get('item', [])))
+        plan = compile_plan(entries, self.formats,
+                            self.body_options.sidecars() if self.body_options is not None else [])
+        os.makedirs(root_dir, exist_ok=True)
+        plan.create_directories(root_dir, log=self.log)
+
+        requests = {}
+        stale = []
+        for entry in plan.apply(entries):
+            _, parents, name, item = entry
+            key = (parents, name)
+            requests[key] = item
+            if self.requests.get(key) != item:
+                stale.append(entry)
+        added = sum(1 for _, parents, name, _ in stale if (parents, name) not in self.requests)
+        removed = [key for key in self.requests if key not in requests]
+
+        write_entries(stale, root_dir, self.formats, self.jobs, log=self.log, body_options=self.body_options,
+                      store=self.store)
+        for parents, name in removed:
+            self._remove(parents, name)
+        self.requests = requests
+        self.syncs += 1
+
+        self.log(f"Sync: {added} added, {len(stale) - added} changed, {len(removed)} removed, "
+                 f"{len(requests) - len(stale)} unchanged ({time.perf_counter() - started:.2f}s)")
+        return added, len(stale) - added, len(removed)
+
+    def _remove(self, parents, name):
+        folder_path = os.path.join(self.root_dir, *parents)
+        for format_type in self.formats + SIDECAR_FORMATS:
+            try:
+                os.remove(os.path.join(folder_path, f"{name}.{format_type}"))
+                self.log(f"Removed {format_type.upper()}: {name}")
+            except FileNotFoundError:
+                pass
+        # Drop folders that became empty, up to the collection root
+        for depth in range(len(parents), 0, -1):
+            try:
+                os.rmdir(os.path.join(self.root_dir, *parents[:depth]))
+            except OSError:
+                break
+
+    def watch(self, stop_event=None):
+        """Sync now, then poll for changes until stop_event is set
+
+        Returns normally on KeyboardInterrupt. A sync that fails, for example
+        on a half-written file, is reported and retried on the next change.
+        """
+        stop_event = stop_event or threading.Event()
+        last = self.signature()
+        self._safe_sync()
+        self.log(f"Watching '{self.collection_file}' for changes...")
+        try:
+            while not stop_event.wait(self.interval):
+                current = self.signature()
+                if current == last:
+                    continue
+                # Debounce: wait until the file stops changing
+                while not stop_event.wait(self.debounce):
+                    settled = self.signature()
+                    if settled == current:
+                        break
+                    current = settled
+                if stop_event.is_set():
+                    break
+                last = current
+                if current is None:
+                    self.log(f"Collection file '{self.collection_file}' is missing, waiting...")
+                    continue
+                self.log("Change detected, syncing...")
+                self._safe_sync()
+        except KeyboardInterrupt:
+            pass
+        self.log("Stopped watching.")
+
+    def _safe_sync(self):
+        try:
+            self.sync()
+            return True
+        except json.JSONDecodeError as e:
+            self.log(f"Error: Invalid JSON in collection file: {str(e)}")
+        except OSError as e:
+            self.log(f"Error: {str(e)}")
+        return False
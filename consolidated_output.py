@@ -0,0 +1,218 @@
+import html
+import os
+import re
+import shutil
+import tempfile
+
+from conversion_stats import timed
+from converter_core import BodyOptions, build_record, render_request_md
+
+CONSOLIDATED_FORMATS = ['md', 'html']
+MAX_HEADING = 6
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 60em; margin: 2em auto; padding: 0 1em; }}
+pre {{ background: #f5f5f5; padding: 0.5em; overflow-x: auto; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ccc; padding: 0.2em 0.5em; text-align: left; }}
+</style>
+</head>
+<body>
+"""
+
+
+def slugify(text):
+    slug = re.sub(r'[^\w\- ]', '', text.lower()).strip().replace(' ', '-')
+    return slug or 'section'
+
+
+def _md_link_text(text):
+    return text.replace('\\', '\\\\').replace('[', '\\[').replace(']', '\\]')
+
+
+def render_request_html(record, level):
+    """Render request details as an HTML fragment below a heading of the given level"""
+    if not record.check():
+        return None
+    section = min(level + 1, MAX_HEADING)
+    escape = html.escape
+    parts = [
+        f"<p><b>Method:</b> <code>{escape(str(record.method))}</code><br>\n",
+        f"<b>URL:</b> <code>{escape(str(record.url))}</code></p>\n",
+    ]
+
+    if record.description:
+        parts.append(f"<h{section}>Description</h{section}>\n<p>{escape(record.description)}</p>\n")
+
+    if record.headers:
+        parts.append(f"<h{section}>Headers</h{section}>\n<table>\n<tr><th>Key</th><th>Value</th></tr>\n")
+        for key, value in record.headers:
+            parts.extend(("<tr><td>", escape(str(key)), "</td><td>", escape(str(value)), "</td></tr>\n"))
+        parts.append("</table>\n")
+
+    if record.has_body:
+        parts.append(f"<h{section}>Body</h{section}>\n")
+        if record.body_raw is not None:
+            parts.extend(("<pre><code>", escape(record.body()), "</code></pre>\n"))
+        elif record.body_fields:
+            parts.append("<table>\n<tr><th>Key</th><th>Value</th><th>Type</th></tr>\n")
+            for key, value, kind in record.body_fields:
+                parts.extend(("<tr><td>", escape(key), "</td><td>", escape(value), "</td><td>", kind,
+                              "</td></tr>\n"))
+            parts.append("</table>\n")
+        elif record.body_graphql is not None:
+            query, variables = record.body_graphql
+            parts.extend(("<pre><code>", escape(str(query)), "</code></pre>\n"))
+            if variables:
+                parts.extend(("<p>Variables:</p>\n<pre><code>", escape(str(variables)), "</code></pre>\n"))
+        elif record.body_file is not None:
+            parts.extend(("<p>File: <code>", escape(record.body_file), "</code></p>\n"))
+
+    return ''.join(parts)
+
+
+class ConsolidatedWriter:
+    """Write a whole collection into one Markdown or HTML document
+
+    Sections are streamed to a temporary file next to path as they arrive,
+    while only the table of contents (title, depth and anchor of every
+    folder and request) is kept in memory. close() then writes the title
+    and the table of contents to the final file, copies the sections after
+    them in chunks and moves the result into place.
+    """
+
+    def __init__(self, path, kind, title, body_options=None):
+        self.path = path
+        self.kind = kind
+        self.title = title
+        # Sidecar files make no sense for a single document
+        if body_options is not None:
+            body_options = BodyOptions(None, body_options.pretty, body_options.pretty_limit)
+        self.body_options = body_options
+        self.toc = []
+        self.anchors = set()
+        self.requests = 0
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self.sections = tempfile.NamedTemporaryFile('w+', encoding='utf-8', newline='\n', dir=parent,
+                                                    prefix='.sections-', suffix='.tmp', delete=False)
+
+    def anchor(self, parents, title):
+        base = slugify('-'.join(parents + (title,)))
+        anchor = base
+        counter = 2
+        while anchor in self.anchors:
+            anchor = f"{base}-{counter}"
+            counter += 1
+        self.anchors.add(anchor)
+        return anchor
+
+    def heading(self, depth, title, anchor):
+        level = min(depth + 2, MAX_HEADING)
+        if self.kind == 'html':
+            return f'<h{level} id="{anchor}">{html.escape(title)}</h{level}>\n'
+        return f'<a id="{anchor}"></a>\n\n{"#" * level} {title}\n\n'
+
+    def folder(self, parents, item):
+        title = str(item.get('name', 'unnamed'))
+        anchor = self.anchor(parents, title)
+        self.toc.append((len(parents), title, anchor))
+        self.sections.write(self.heading(len(parents), title, anchor))
+
+    def request(self, parents, item):
+        """Append one request section; raises what its renderer raised"""
+        title = str(item.get('name', 'unnamed'))
+        record = build_record(item, title, keep_item=False, body_options=self.body_options)
+        level = min(len(parents) + 2, MAX_HEADING)
+        if self.kind == 'html':
+            content = render_request_html(record, level)
+        else:
+            content = render_request_md(record, level)
+        if content is None:
+            return False
+        anchor = self.anchor(parents, title)
+        self.toc.append((len(parents), title, anchor))
+        if self.kind == 'html':
+            self.sections.write(self.heading(len(parents), title, anchor))
+            self.sections.write(content)
+        else:
+            # The Markdown renderer writes its own title heading
+            self.sections.write(f'<a id="{anchor}"></a>\n\n')
+            self.sections.write(content)
+        self.requests += 1
+        return True
+
+    def _write_toc(self, f):
+        if self.kind == 'html':
+            f.write(HTML_HEAD.format(title=html.escape(self.title)))
+            f.write(f"<h1>{html.escape(self.title)}</h1>\n<nav>\n")
+            depth = -1
+            for entry_depth, title, anchor in self.toc:
+                if entry_depth > depth:
+                    f.write("<ul>\n" * (entry_depth - depth))
+                else:
+                    f.write("</li>\n")
+                    f.write("</ul>\n</li>\n" * (depth - entry_depth))
+                f.write(f'<li><a href="#{anchor}">{html.escape(title)}</a>')
+                depth = entry_depth
+            if depth >= 0:
+                f.write("</li>\n" + "</ul>\n</li>\n" * depth + "</ul>\n")
+            f.write("</nav>\n")
+        else:
+            f.write(f"# {self.title}\n\n## Contents\n\n")
+            for depth, title, anchor in self.toc:
+                f.write(f"{'  ' * depth}- [{_md_link_text(title)}](#{anchor})\n")
+            f.write("\n")
+
+    def close(self):
+        tmp_path = self.path + '.tmp'
+        self.sections.flush()
+        self.sections.seek(0)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+                self._write_toc(f)
+                shutil.copyfileobj(self.sections, f)
+                if self.kind == 'html':
+                    f.write("</body>\n</html>\n")
+            os.replace(tmp_path, self.path)
+        finally:
+            self.discard()
+
+    def discard(self):
+        self.sections.close()
+        if os.path.exists(self.sections.name):
+            os.remove(self.sections.name)
+
+
+def write_consolidated(entries, path, kind, title, log=print, stats=None, body_options=None):
+    """Stream every entry into one document at path; returns the number of requests written"""
+    writer = ConsolidatedWriter(path, kind, title, body_options)
+    try:
+        for entry_kind, parents, _, item in entries:
+            if entry_kind == 'folder':
+                writer.folder(parents, item)
+                continue
+            try:
+                with timed(stats, 'render'):
+                    written = writer.request(parents, item)
+                if written and stats is not None:
+                    stats.count('requests')
+            except Exception as e:
+                message = f"Error saving {kind.upper()} {item.get('name', 'unnamed')}: {str(e)}"
+                log(message)
+                if stats is not None:
+                    stats.error(message)
+    except BaseException:
+        writer.discard()
+        raise
+    with timed(stats, 'write'):
+        writer.close()
+    if stats is not None:
+        stats.file_written(kind, os.path.getsize(path))
+    log(f"Saved {kind.upper()}: {path} ({writer.requests} requests)")
+    return writer.requests
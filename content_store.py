@@ -0,0 +1,108 @@
+import errno
+import hashlib
+import os
+import shutil
+import threading
+
+STORE_NAME = '.converter_store'
+LINK_MODES = ['hard', 'symlink', 'copy']
+
+
+def store_path(output_dir):
+    return os.path.join(output_dir, STORE_NAME)
+
+
+def has_store(output_dir):
+    """Return True if output_dir was written with deduplication before"""
+    return os.path.isdir(store_path(output_dir))
+
+
+def _format_bytes(size):
+    for unit in ['bytes', 'KB', 'MB']:
+        if size < 1024 or unit == 'MB':
+            return f"{size} {unit}" if unit == 'bytes' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class ContentStore:
+    """Store each distinct document once and link the output files to it
+
+    Documents are kept under output_dir/.converter_store, named by the
+    SHA-256 of their content. A saved file is a hard link to its blob, or a
+    relative symbolic link with mode='symlink'. Where a link cannot be made
+    (another file system, no permission, too many links) the next mode in
+    LINK_MODES is tried, down to a plain copy. Existing files are always
+    replaced rather than written to, since a hard link shares its content
+    with the blob and every other copy. save() may be called from several
+    writer threads.
+    """
+
+    def __init__(self, output_dir, mode='hard'):
+        if mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode '{mode}'")
+        self.root = store_path(output_dir)
+        self.modes = LINK_MODES[LINK_MODES.index(mode):]
+        self.documents = 0
+        self.unique = 0
+        self.bytes_total = 0
+        self.bytes_saved = 0
+        self.by_mode = dict.fromkeys(LINK_MODES, 0)
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def save(self, filepath, content):
+        """Save content at filepath through the store; returns its size in bytes"""
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        blob = self.blob_path(digest)
+        with self._lock:
+            first = digest not in self._seen
+            self._seen.add(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            # Another thread or process may store the same blob; both write the same bytes.
+            # os.open() with 0o666 leaves the mode to the umask, like a plainly written file
+            tmp_path = f"{blob}.{os.getpid()}-{threading.get_ident()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, blob)
+        size = os.path.getsize(blob)
+        mode = self._materialize(blob, filepath)
+        with self._lock:
+            self.documents += 1
+            self.bytes_total += size
+            self.by_mode[mode] += 1
+            if first:
+                self.unique += 1
+            elif mode != 'copy':
+                self.bytes_saved += size
+        return size
+
+    def _materialize(self, blob, filepath):
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+        for mode in self.modes:
+            try:
+                if mode == 'hard':
+                    os.link(blob, filepath)
+                elif mode == 'symlink':
+                    os.symlink(os.path.relpath(blob, os.path.dirname(filepath)), filepath)
+                else:
+                    shutil.copyfile(blob, filepath)
+                return mode
+            except OSError as e:
+                if mode == 'copy' or e.errno == errno.ENOENT:
+                    raise
+
+    def ratio(self):
+        return self.documents / self.unique if self.unique else 1.0
+
+    def summary(self):
+        links = ", ".join(f"{count} {mode}" for mode, count in self.by_mode.items() if count)
+        return (f"Dedup: {self.documents} documents, {self.unique} unique (ratio {self.ratio():.2f}), "
+                f"{_format_bytes(self.bytes_saved)} saved" + (f"; {links}" if links else ""))
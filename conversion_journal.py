@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import shutil
+
+JOURNAL_NAME = '.converter_journal'
+
+
+def staging_path(output_dir, root):
+    return os.path.join(output_dir, f".{root}.staging")
+
+
+def backup_path(output_dir, root):
+    return os.path.join(output_dir, f".{root}.old")
+
+
+class Journal:
+    """Append-only record of the requests whose files were all written
+
+    One line per request: a digest of the source item and the options,
+    a tab, and the planned request path. Lines are flushed as they are
+    written, so a killed run loses at most the request it was working on;
+    a torn last line is ignored when the journal is read back.
+    """
+
+    def __init__(self, path, formats, variant='', resume=False):
+        self.path = path
+        self.options = f"{','.join(formats)}\0{variant}"
+        self.done = self._load() if resume else {}
+        self.skipped = 0
+        self.recorded = 0
+        self.f = open(path, 'a' if resume else 'w', encoding='utf-8', newline='\n')
+
+    def _load(self):
+        done = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8', newline='\n') as f:
+                for line in f:
+                    if line.endswith('\n') and '\t' in line:
+                        digest, path = line[:-1].split('\t', 1)
+                        done[path] = digest
+        except FileNotFoundError:
+            pass
+        return done
+
+    def digest(self, item):
+        source = json.dumps(item, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(f"{self.options}\0{source}".encode('utf-8')).hexdigest()
+
+    def check(self, parents, name, item):
+        """Return None if the request is journaled already, else a done callback that journals it"""
+        path = '/'.join(parents + (name,))
+        digest = self.digest(item)
+        if self.done.get(path) == digest:
+            self.skipped += 1
+            return None
+
+        def done(results):
+            # A request is only complete once every format was saved
+            if all(saved is not False for saved in results.values()):
+                self.f.write(f"{digest}\t{path}\n")
+                self.f.flush()
+                self.recorded += 1
+        return done
+
+    def unfinished(self, total):
+        """Return how many of total requests were neither journaled now nor by an earlier run"""
+        return total - self.recorded - self.skipped
+
+    def close(self):
+        if not self.f.closed:
+            self.f.flush()
+            os.fsync(self.f.fileno())
+            self.f.close()
+
+    def summary(self):
+        return f"Journal: {self.recorded} requests written, {self.skipped} already written by an earlier run"
+
+
+class StagedOutput:
+    """Build an output root in a staging directory and swap it in at the end
+
+    The staging directory sits next to the root, so the swap is two
+    renames on the same file system: the old root is moved aside, the
+    staging directory takes its place, and the old root is deleted. Until
+    then the previous output stays untouched. An interrupted run leaves
+    the staging directory and its journal behind for resume=True to
+    continue from; without resume they are cleared first.
+    """
+
+    def __init__(self, output_dir, root, formats, variant='', resume=False):
+        self.root_dir = os.path.join(output_dir, root)
+        self.path = staging_path(output_dir, root)
+        self.backup = backup_path(output_dir, root)
+        self.resumed = resume and os.path.isdir(self.path)
+        if not self.resumed and os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path, exist_ok=True)
+        self.journal = Journal(os.path.join(self.path, JOURNAL_NAME), formats, variant, self.resumed)
+
+    def abort(self):
+        """Stop here, keeping the staging directory for a later resume"""
+        self.journal.close()
+
+    def finish(self, plan, extra_formats=(), log=print):
+        """Swap the staging directory in as the root
+
+        A resumed run first removes the files and folders an earlier run
+        staged that are not in plan, for example for requests that were
+        removed from the collection since. extra_formats are the sidecar
+        formats a request may have besides plan.formats.
+        """
+        self.journal.close()
+        os.remove(self.journal.path)
+        if self.resumed:
+            removed = self._remove_stale(plan, extra_formats)
+            if removed:
+                log(f"Removed {removed} staged files and folders that are no longer in the collection")
+        if os.path.exists(self.backup):
+            # Left over from a run that stopped between the two renames
+            shutil.rmtree(self.backup)
+        if os.path.exists(self.root_dir):
+            os.replace(self.root_dir, self.backup)
+        os.replace(self.path, self.root_dir)
+        shutil.rmtree(self.backup, ignore_errors=True)
+        log(f"Moved the finished output into place: {self.root_dir}")
+
+    def _remove_stale(self, plan, extra_formats):
+        formats = list(plan.formats) + list(extra_formats)
+        files = {os.path.join(self.path, *parents, f"{name}.{format_type}")
+                 for parents, name in plan.requests for format_type in formats}
+        folders = {os.path.join(self.path, *folder) for folder in plan.folders}
+        removed = 0
+        for dirpath, dirnames, filenames in os.walk(self.path, topdown=False):
+            for filename in filenames:
+                filepath = os.path.join(dirpath, filename)
+                if filepath not in files:
+                    os.remove(filepath)
+                    removed += 1
+            if dirpath != self.path and dirpath not in folders and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+                removed += 1
+        return removed
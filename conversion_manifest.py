@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = '.converter_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def item_digests(item, formats, variant=''):
+    """Hash a source item together with each format it is rendered in
+
+    variant identifies any other settings the output depends on.
+    """
+    source = hashlib.sha256(
+        json.dumps(item, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    ).hexdigest()
+    if variant:
+        source += f"\0{variant}"
+    return {
+        format_type: hashlib.sha256(f"{MANIFEST_VERSION}\0{format_type}\0{source}".encode('utf-8')).hexdigest()
+        for format_type in formats
+    }
+
+
+class Manifest:
+    """Record of which source item produced each file in an output directory
+
+    Paths are stored relative to root_dir with forward slashes. Call
+    is_current() before writing a file and written() once it has been saved;
+    finish() then drops entries for files whose source item is gone.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.path = os.path.join(root_dir, MANIFEST_NAME)
+        self.old = self._load()
+        self.files = {}
+        self.added = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.pruned = False
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data.get('files', {})
+
+    def relative(self, filepath):
+        return os.path.relpath(filepath, self.root_dir).replace(os.sep, '/')
+
+    def is_current(self, filepath, digest):
+        """Return True if filepath was already written from the same source"""
+        rel = self.relative(filepath)
+        if self.old.get(rel) == digest and os.path.exists(filepath):
+            self.files[rel] = digest
+            self.unchanged += 1
+            return True
+        return False
+
+    def written(self, filepath, digest):
+        rel = self.relative(filepath)
+        if rel in self.old:
+            self.changed += 1
+        else:
+            self.added += 1
+        self.files[rel] = digest
+
+    def finish(self, prune=False, log=print):
+        """Handle files whose source item is gone and save the manifest
+
+        Without prune the stale files are left on disk and kept in the
+        manifest so that a later pruning run can still delete them.
+        """
+        self.pruned = prune
+        for rel, digest in self.old.items():
+            if rel in self.files:
+                continue
+            self.removed += 1
+            if not prune:
+                self.files[rel] = digest
+                continue
+            filepath = os.path.join(self.root_dir, *rel.split('/'))
+            try:
+                os.remove(filepath)
+                log(f"Removed: {rel}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log(f"Error removing {rel}: {str(e)}")
+                self.files[rel] = digest
+                continue
+            self._remove_empty_dirs(os.path.dirname(filepath))
+        self.save()
+
+    def _remove_empty_dirs(self, folder_path):
+        root = os.path.abspath(self.root_dir)
+        folder_path = os.path.abspath(folder_path)
+        while folder_path != root and folder_path.startswith(root):
+            try:
+                os.rmdir(folder_path)
+            except OSError:
+                return
+            folder_path = os.path.dirname(folder_path)
+
+    def save(self):
+        data = {'version': MANIFEST_VERSION, 'files': dict(sorted(self.files.items()))}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        summary = (f"Files: {self.added} added, {self.changed} changed, "
+                   f"{self.unchanged} unchanged, {self.removed} removed")
+        if self.removed and not self.pruned:
+            summary += " (kept on disk, use --prune to delete)"
+        return summary
@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from conversion_manifest import item_digests
+
+SHARD_VERSION = 2
+SHARD_PREFIX = '.converter_shard-'
+
+
+def parse_shard(value):
+    """Parse 'i/N' into (i, N), with shards numbered from 1"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"invalid shard '{value}', expected i/N") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard '{value}', i must be between 1 and N")
+    return index, count
+
+
+def request_path(parents, name):
+    return '/'.join(parents + (name,))
+
+
+def shard_of(path, count):
+    """Return the shard (1 to count) a planned request path belongs to
+
+    Uses SHA-256 rather than hash(), which differs between processes.
+    """
+    digest = hashlib.sha256(path.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def request_digest(item, formats, variant=''):
+    """Hash a source item together with the formats and options it is written with"""
+    digests = item_digests(item, formats, variant)
+    return hashlib.sha256('\0'.join(digests[f] for f in formats).encode('utf-8')).hexdigest()
+
+
+def shard_entries(entries, shard, sources=None, formats=(), variant=''):
+    """Pass through only the request entries that belong to shard (i, N)
+
+    With a sources dict, the request_digest() of every request, in the
+    shard or not, is stored in it by planned path.
+    """
+    index, count = shard
+    for entry in entries:
+        path = request_path(entry[1], entry[2])
+        if sources is not None:
+            sources[path] = request_digest(entry[3], formats, variant)
+        if shard_of(path, count) == index:
+            yield entry
+
+
+def shard_requests(plan, shard):
+    """Return the planned (parents, name) of every request in shard (i, N)"""
+    index, count = shard
+    return [(parents, name) for parents, name in plan.requests
+            if shard_of(request_path(parents, name), count) == index]
+
+
+def shard_paths(plan, shard):
+    """Return every folder, and the file paths of the requests in shard, sorted"""
+    paths = ['/'.join(folder) + '/' for folder in plan.folders]
+    for parents, name in shard_requests(plan, shard):
+        for format_type in plan.formats:
+            paths.append(f"{request_path(parents, name)}.{format_type}")
+    return sorted(paths)
+
+
+def plan_digest(sources, formats, roots):
+    """Fingerprint of the requests a full run writes, where, and from which source items and options
+
+    sources maps every planned request path to its request_digest().
+    """
+    data = json.dumps({'formats': list(formats), 'roots': list(roots), 'requests': sorted(sources.items())},
+                      ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def manifest_name(shard):
+    index, count = shard
+    return f"{SHARD_PREFIX}{index}-of-{count}.json"
+
+
+def write_shard_manifest(output_dir, shard, plan, roots, sources, extra_formats=()):
+    """Record what one shard wrote, once it has finished
+
+    sources is the dict filled by shard_entries(). Every shard stores the
+    fingerprint of the full plan, the requests it was assigned with their
+    digests and the files that exist for them (documents and sidecars),
+    with paths relative to output_dir.
+    """
+    index, count = shard
+    requests = {}
+    files = []
+    for parents, name in shard_requests(plan, shard):
+        path = request_path(parents, name)
+        requests[path] = sources.get(path)
+        for root in roots:
+            for format_type in list(plan.formats) + list(extra_formats):
+                rel = f"{root}/{path}.{format_type}"
+                if os.path.exists(os.path.join(output_dir, *rel.split('/'))):
+                    files.append(rel)
+    data = {
+        'version': SHARD_VERSION,
+        'shard': index,
+        'count': count,
+        'plan': plan_digest(sources, plan.formats, roots),
+        'formats': list(plan.formats),
+        'roots': list(roots),
+        'folders': [root for root in roots] + [f"{root}/{'/'.join(folder)}" for root in roots
+                                               for folder in plan.folders],
+        'requests': requests,
+        'files': files,
+    }
+    path = os.path.join(output_dir, manifest_name(shard))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_shard_manifests(directories):
+    """Return [(directory, manifest)] for every shard manifest in directories"""
+    found = []
+    for directory in directories:
+        for filename in sorted(os.listdir(directory)):
+            if filename.startswith(SHARD_PREFIX) and filename.endswith('.json'):
+                with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                    found.append((directory, json.load(f)))
+    return found
+
+
+def verify_shards(manifests):
+    """Return a list of problems; empty when the shards add up to a full run"""
+    if not manifests:
+        return ["No shard manifests found"]
+    problems = []
+    first = manifests[0][1]
+    count = first.get('count')
+    seen = {}
+    for directory, manifest in manifests:
+        index = manifest.get('shard')
+        label = f"shard {index}/{manifest.get('count')} in {directory}"
+        if manifest.get('version') != SHARD_VERSION:
+            problems.append(f"{label}: unsupported manifest version")
+            continue
+        if (manifest['count'], manifest['plan']) != (count, first['plan']):
+            problems.append(f"{label}: written from a different collection, shard count or options")
+            continue
+        if index in seen:
+            problems.append(f"{label}: shard also found in {seen[index]}")
+            continue
+        seen[index] = directory
+        for rel in manifest['files']:
+            if not os.path.exists(os.path.join(directory, *rel.split('/'))):
+                problems.append(f"{label}: missing file {rel}")
+    if problems:
+        return problems
+
+    missing = sorted(set(range(1, count + 1)) - set(seen))
+    if missing:
+        problems.append(f"Missing shards: {', '.join(str(index) for index in missing)} of {count}")
+    assigned = {}
+    sources = {}
+    for directory, manifest in manifests:
+        for path, digest in manifest['requests'].items():
+            if path in assigned:
+                problems.append(f"Request {path} written by shards {assigned[path]} and {manifest['shard']}")
+            assigned[path] = manifest['shard']
+            sources[path] = digest
+    if not missing and plan_digest(sources, first['formats'], first['roots']) != first['plan']:
+        problems.append("The shards' requests do not add up to the full collection")
+    return problems
+
+
+def _copy(source, target):
+    # Replace rather than overwrite: target may be a hard link into a content store
+    try:
+        os.remove(target)
+    except FileNotFoundError:
+        pass
+    shutil.copyfile(source, target)
+
+
+def merge_shards(output_dir, shard_dirs=(), log=print):
+    """Verify the shards in output_dir and shard_dirs and copy them into output_dir
+
+    Shards written straight into a shared output_dir are only verified.
+    Returns True when every shard was present and the union matches the
+    plan of a full run.
+    """
+    directories = [output_dir] + [d for d in shard_dirs if os.path.abspath(d) != os.path.abspath(output_dir)]
+    try:
+        manifests = load_shard_manifests(d for d in directories if os.path.isdir(d))
+    except (OSError, ValueError) as e:
+        log(f"Error: Cannot read shard manifest: {str(e)}")
+        return False
+    problems = verify_shards(manifests)
+    for problem in problems:
+        log(f"Error: {problem}")
+    if problems:
+        return False
+
+    copied = 0
+    for directory, manifest in manifests:
+        if os.path.abspath(directory) == os.path.abspath(output_dir):
+            continue
+        for folder in manifest['folders']:
+            os.makedirs(os.path.join(output_dir, *folder.split('/')), exist_ok=True)
+        for rel in manifest['files'] + [manifest_name((manifest['shard'], manifest['count']))]:
+            _copy(os.path.join(directory, *rel.split('/')), os.path.join(output_dir, *rel.split('/')))
+        copied += len(manifest['files'])
+    requests = sum(len(manifest['requests']) for _, manifest in manifests)
+    files = sum(len(manifest['files']) for _, manifest in manifests)
+    log(f"Verified {len(manifests)} shards: {requests} requests, {files} files ({copied} files copied)")
+    return True
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Verify the shards of a conversion run with --shard and merge them")
+    parser.add_argument('output_dir', help="Output directory of the full run; shards may have written into it")
+    parser.add_argument('shard_dirs', nargs='*', help="Output directories of shards run elsewhere, to copy in")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    return merge_shards(args.output_dir, args.shard_dirs)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
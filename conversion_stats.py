@@ -0,0 +1,156 @@
+import contextlib
+import heapq
+import json
+import threading
+import time
+
+PHASES = ['parse', 'plan', 'mkdir', 'render', 'write']
+MAX_ERRORS = 100
+
+
+class ConversionStats:
+    """Per-phase timers and counters collected during one conversion
+
+    Phases nest: time spent in an inner phase (for example parsing while the
+    planner pulls the next entry) is not counted again in the outer one.
+    render and write are summed over all writer threads, so with --jobs they
+    can add up to more than the wall time. Every hook is called with
+    as_dict() when finish() runs, which is how a job runner can forward the
+    numbers to its metrics system.
+    """
+
+    def __init__(self, slowest=10, hooks=None):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.counters = {'items_visited': 0, 'folders_created': 0, 'requests': 0,
+                         'files_written': 0, 'files_unchanged': 0, 'errors': 0}
+        self.bytes_written = {}
+        self.files_by_format = {}
+        self.slowest_count = slowest
+        self.slowest = []
+        self.errors = []
+        self.hooks = list(hooks or [])
+        self.wall_seconds = 0.0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        now = time.perf_counter()
+        if stack:
+            # Pause the enclosing phase until this one ends
+            self._add_time(stack[-1][0], now - stack[-1][1])
+        current = [name, now]
+        stack.append(current)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            stack.pop()
+            self._add_time(name, now - current[1])
+            if stack:
+                stack[-1][1] = now
+
+    def _add_time(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def file_written(self, format_type, size):
+        with self._lock:
+            self.counters['files_written'] += 1
+            self.files_by_format[format_type] = self.files_by_format.get(format_type, 0) + 1
+            self.bytes_written[format_type] = self.bytes_written.get(format_type, 0) + size
+
+    def item_done(self, path, seconds):
+        """Remember the time one request took to render and write"""
+        with self._lock:
+            entry = (seconds, path)
+            if len(self.slowest) < self.slowest_count:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def error(self, message):
+        with self._lock:
+            self.counters['errors'] += 1
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append(message)
+
+    def iterate(self, entries, count=False):
+        """Pass entries through, timing the work of producing them as parsing"""
+        entries = iter(entries)
+        while True:
+            with self.phase('parse'):
+                entry = next(entries, None)
+            if entry is None:
+                return
+            if count:
+                self.count('items_visited')
+            yield entry
+
+    def finish(self):
+        """Stop the wall clock and call every hook with the collected numbers"""
+        self.wall_seconds = time.perf_counter() - self._started
+        data = self.as_dict()
+        for hook in self.hooks:
+            hook(data)
+        return data
+
+    def as_dict(self):
+        return {
+            'wall_seconds': round(self.wall_seconds, 4),
+            'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            'counters': dict(self.counters),
+            'files_by_format': dict(self.files_by_format),
+            'bytes_written': dict(self.bytes_written),
+            'slowest_items': [{'path': path, 'seconds': round(seconds, 4)}
+                              for seconds, path in sorted(self.slowest, reverse=True)],
+            'errors': list(self.errors),
+        }
+
+    def summary_lines(self):
+        counters = self.counters
+        lines = ["Statistics:"]
+        lines.append("  Phases:  " + "  ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items())
+                     + f"  (wall {self.wall_seconds:.3f}s)")
+        lines.append(f"  Items:   {counters['items_visited']} visited, {counters['folders_created']} folders created, "
+                     f"{counters['requests']} requests, {counters['files_unchanged']} files unchanged")
+        for format_type, size in sorted(self.bytes_written.items()):
+            lines.append(f"  {format_type.upper():<5}    {self.files_by_format[format_type]} files, {size} bytes")
+        lines.append(f"  Errors:  {counters['errors']}")
+        if self.slowest:
+            lines.append("  Slowest items:")
+            for seconds, path in sorted(self.slowest, reverse=True):
+                lines.append(f"    {seconds:8.4f}s  {path}")
+        return lines
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2, ensure_ascii=False)
+
+
+class _NoPhase:
+    """Stand-in for stats.phase() when nothing is measured (contextlib.nullcontext needs 3.7)"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_PHASE = _NoPhase()
+
+
+def timed(stats, name):
+    """stats.phase(name), or a no-op context when stats is None"""
+    if stats is None:
+        return NO_PHASE
+    return stats.phase(name)
@@ -0,0 +1,1221 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from archive_output import JsonlBundle, archive_path, archive_type, open_bundle
+from collection_stream import read_collection
+from conversion_journal import StagedOutput
+from conversion_manifest import Manifest, item_digests
+from conversion_shards import shard_entries, shard_paths, shard_requests, write_shard_manifest
+from content_store import ContentStore, has_store
+from conversion_stats import ConversionStats, timed
+from environments import CompiledRequest, Environment, load_environment, variable_values
+from search_index import SearchIndex
+from write_plan import WritePlanner, compile_plan
+
+def sanitize_name(name):
+    """Remove invalid characters for folder/file names"""
+    invalid_chars = '<>:"/\\|?*'
+    for char in invalid_chars:
+        name = name.replace(char, '_')
+    return name.strip()
+
+FORMATS = ['txt', 'json', 'md']
+PRETTY_LIMIT = 1024 * 1024
+SIDECAR_FORMATS = ['body.json', 'body.txt']
+
+class BodyOptions:
+    """How request bodies are written
+
+    Raw bodies longer than max_inline characters are saved to a sidecar
+    file next to the documents (`<name>.body.json` or `<name>.body.txt`),
+    which the documents link to instead of inlining the body. With pretty,
+    JSON bodies of up to pretty_limit characters are pretty-printed in TXT
+    and Markdown output.
+    """
+    __slots__ = ('max_inline', 'pretty', 'pretty_limit')
+    
+    def __init__(self, max_inline=None, pretty=False, pretty_limit=PRETTY_LIMIT):
+        self.max_inline = max_inline
+        self.pretty = pretty
+        self.pretty_limit = pretty_limit
+        
+    def sidecars(self):
+        """Return the sidecar formats a request may be saved with"""
+        return SIDECAR_FORMATS if self.max_inline is not None else []
+        
+    def key(self):
+        """Identify the options in manifest digests, so changing them rewrites the files"""
+        return f"{self.max_inline}:{self.pretty}:{self.pretty_limit}"
+
+class RequestRecord:
+    """Compact, format independent view of one request
+
+    Built once per request and shared by every renderer. The source item is
+    only kept when a format needs it (JSON dumps the item as is). Problems
+    reading the request are stored in error and raised by the renderers that
+    need those fields, so one broken request fails the same way in every
+    format.
+    """
+    __slots__ = ('name', 'item', 'has_request', 'method', 'url', 'description', 'headers',
+                 'has_body', 'body_mode', 'body_raw', 'body_fields', 'body_graphql', 'body_file',
+                 'body_options', 'body_text', 'sidecar', 'error')
+    
+    def __init__(self, name, item=None, body_options=None):
+        self.name = name
+        self.item = item
+        self.has_request = False
+        self.method = None
+        self.url = None
+        self.description = ''
+        self.headers = ()
+        self.has_body = False
+        self.body_mode = None
+        self.body_raw = None
+        self.body_fields = None
+        self.body_graphql = None
+        self.body_file = None
+        self.body_options = body_options
+        self.body_text = None
+        self.sidecar = None
+        self.error = None
+        
+    def load(self, request):
+        """Copy the rendered fields out of a Postman request dict"""
+        self.has_request = True
+        self.method = request.get('method', 'N/A')
+        self.url = request.get('url', {}).get('raw', 'N/A')
+        self.description = request.get('description', '').strip()
+        
+        headers = request.get('header', [])
+        if headers:
+            self.headers = tuple((header.get('key', ''), header.get('value', '')) for header in headers)
+            
+        body = request.get('body')
+        if body:
+            self.has_body = True
+            mode = self.body_mode = body.get('mode')
+            if mode == 'raw':
+                self.body_raw = body.get('raw', '')
+            elif mode in ('formdata', 'urlencoded'):
+                self.body_fields = tuple(_body_fields(body.get(mode)))
+            elif mode == 'graphql':
+                graphql = body.get('graphql')
+                if isinstance(graphql, dict):
+                    self.body_graphql = (graphql.get('query', ''), graphql.get('variables', ''))
+            elif mode == 'file':
+                source = body.get('file')
+                self.body_file = source.get('src', '') if isinstance(source, dict) else ''
+                
+        options = self.body_options
+        if (options is not None and options.max_inline is not None and isinstance(self.body_raw, str)
+                and len(self.body_raw) > options.max_inline):
+            self.sidecar = SIDECAR_FORMATS[0] if _looks_like_json(self.body_raw, body) else SIDECAR_FORMATS[1]
+            
+    def body(self):
+        """Return the raw body as it should be inlined, pretty-printed on first use if enabled"""
+        if self.body_text is None:
+            self.body_text = self.body_raw
+            options = self.body_options
+            if (options is not None and options.pretty and len(self.body_raw) <= options.pretty_limit
+                    and _looks_like_json(self.body_raw)):
+                try:
+                    self.body_text = json.dumps(json.loads(self.body_raw), indent=2, ensure_ascii=False)
+                except ValueError:
+                    pass
+        return self.body_text
+        
+    def check(self):
+        if self.error is not None:
+            raise self.error
+        return self.has_request
+
+def _body_fields(fields):
+    """Yield (key, value, type) for the enabled fields of a formdata or urlencoded body"""
+    for field in fields if isinstance(fields, list) else []:
+        if not isinstance(field, dict) or field.get('disabled'):
+            continue
+        kind = field.get('type', 'text')
+        value = field.get('src', '') if kind == 'file' else field.get('value', '')
+        if isinstance(value, list):
+            value = ', '.join(str(v) for v in value)
+        yield str(field.get('key', '')), value if isinstance(value, str) else str(value), kind
+
+def _looks_like_json(raw, body=None):
+    """Trust the body's declared language if it has one, else look at the first character"""
+    options = body.get('options') if isinstance(body, dict) else None
+    raw_options = options.get('raw') if isinstance(options, dict) else None
+    if isinstance(raw_options, dict) and raw_options.get('language'):
+        return raw_options['language'] == 'json'
+    return raw.lstrip()[:1] in ('{', '[')
+
+def build_record(item, name, keep_item=True, body_options=None):
+    """Return the RequestRecord for a request item"""
+    record = RequestRecord(name, item if keep_item else None, body_options)
+    if 'request' in item:
+        try:
+            record.load(item['request'])
+        except Exception as e:
+            record.error = e
+    return record
+
+def render_request_txt(record):
+    """Render request details as TXT, or return None for items without a request"""
+    if not record.check():
+        return None
+        
+    parts = [
+        f"API Endpoint: {record.name}\n",
+        "=" * 50 + "\n",
+        f"Method: {record.method}\n",
+        f"URL: {record.url}\n\n",
+    ]
+    
+    if record.description:
+        parts.append("Description:\n")
+        parts.append(record.description + "\n\n")
+        
+    # Headers
+    if record.headers:
+        parts.append("Headers:\n")
+        for key, value in record.headers:
+            parts.append(f"  {key}: {value}\n")
+        parts.append("\n")
+        
+    # Body (if present)
+    if record.has_body:
+        parts.append("Body:\n")
+        if record.sidecar is not None:
+            parts.append(f"Stored in {record.name}.{record.sidecar} ({len(record.body_raw)} characters)\n")
+        elif record.body_raw is not None:
+            parts.append(record.body() + "\n")
+        elif record.body_fields:
+            for key, value, kind in record.body_fields:
+                parts.extend(("  ", key, ": <file: " if kind == 'file' else ": ", value,
+                              ">\n" if kind == 'file' else "\n"))
+        elif record.body_graphql is not None:
+            query, variables = record.body_graphql
+            parts.extend(("Query:\n", query, "\n"))
+            if variables:
+                parts.extend(("Variables:\n", variables, "\n"))
+        elif record.body_file is not None:
+            parts.extend(("File: ", record.body_file, "\n"))
+        parts.append("\n")
+        
+    return ''.join(parts)
+
+def render_request_json(record):
+    """Render the entire source item as pretty printed JSON"""
+    item = record.item
+    if record.sidecar is not None:
+        # Point to the sidecar instead of repeating the body
+        body = dict(item['request']['body'], raw=f"<stored in {record.name}.{record.sidecar}>")
+        item = dict(item, request=dict(item['request'], body=body))
+    return json.dumps(item, indent=2, ensure_ascii=False)
+
+def render_request_md(record, level=1):
+    """Render request details as Markdown, or return None for items without a request
+
+    level is the heading level of the title; sections are one level below.
+    """
+    if not record.check():
+        return None
+    section = '#' * min(level + 1, 6)
+        
+    parts = [
+        f"{'#' * level} {record.name}\n\n",
+        f"**Method:** `{record.method}`  \n",
+        f"**URL:** `{record.url}`\n\n",
+    ]
+    
+    if record.description:
+        parts.append(f"{section} Description\n{record.description}\n\n")
+        
+    # Headers
+    if record.headers:
+        parts.append(f"{section} Headers\n")
+        parts.append("| Key | Value |\n|-----|-------|\n")
+        for key, value in record.headers:
+            parts.append(f"| {key} | {value} |\n")
+        parts.append("\n")
+        
+    # Body (if present)
+    if record.has_body:
+        parts.append(f"{section} Body\n")
+        if record.sidecar is not None:
+            filename = f"{record.name}.{record.sidecar}"
+            parts.append(f"Stored in [{filename}](<{filename}>) ({len(record.body_raw)} characters)\n")
+        elif record.body_raw is not None:
+            parts.append("```json\n")
+            parts.append(record.body() + "\n")
+            parts.append("```\n")
+        elif record.body_fields:
+            parts.append("| Key | Value | Type |\n|-----|-------|------|\n")
+            for key, value, kind in record.body_fields:
+                parts.extend(("| ", key, " | ", value, " | ", kind, " |\n"))
+        elif record.body_graphql is not None:
+            query, variables = record.body_graphql
+            parts.extend(("```graphql\n", query, "\n```\n"))
+            if variables:
+                parts.extend(("\n", '#' * min(level + 2, 6), " Variables\n```json\n", variables, "\n```\n"))
+        elif record.body_file is not None:
+            parts.append(f"File: `{record.body_file}`\n")
+        parts.append("\n")
+        
+    return ''.join(parts)
+
+RENDERERS = {
+    'txt': render_request_txt,
+    'json': render_request_json,
+    'md': render_request_md,
+}
+
+def as_formats(format_type):
+    """Accept a single format name or a sequence of them"""
+    if isinstance(format_type, str):
+        return [format_type]
+    return list(format_type)
+
+def render_documents(item, name, formats, stats=None, body_options=None):
+    """Yield (format, content, error) for every format from one RequestRecord
+
+    content is None when the item has nothing to render in that format.
+    """
+    with timed(stats, 'render'):
+        record = build_record(item, name, keep_item='json' in formats, body_options=body_options)
+    yield from render_record(record, formats, stats)
+
+def render_record(record, formats, stats=None):
+    for format_type in formats:
+        try:
+            with timed(stats, 'render'):
+                content = RENDERERS[format_type](record)
+        except Exception as e:
+            yield format_type, None, e
+        else:
+            yield format_type, content, None
+
+    if record.sidecar is not None and record.error is None:
+        # The body goes to its own file as it is, not through a rendered document
+        yield record.sidecar, record.body_raw, None
+def render_environments(item, name, formats, environments, stats=None, body_options=None):
+    """Yield (environment, format, content, error) for every environment and format
+
+    The request is read and its URL, headers and body are compiled into
+    templates once; each environment only fills in its values. JSON output
+    is the source item with the filled in URL, headers and body.
+    """
+    with timed(stats, 'render'):
+        record = build_record(item, name, keep_item='json' in formats, body_options=body_options)
+        compiled = CompiledRequest(record) if record.error is None and record.has_request else None
+    for environment in environments:
+        if compiled is not None:
+            missing = set()
+            with timed(stats, 'render'):
+                env_record = compiled.render(environment.variables, missing)
+            environment.report(missing)
+        else:
+            env_record = record
+        for format_type, content, error in render_record(env_record, formats, stats):
+            yield environment, format_type, content, error
+
+def save_document(folder_path, name, format_type, content, error, log=print, stats=None, label=None,
+                  store=None):
+    """Save one rendered document; returns True, False on error, or None if there was nothing to save
+
+    With a ContentStore the file is linked to the store's copy of the content.
+    """
+    label = label or format_type.upper()
+    if error is None and content is None:
+        return None
+    try:
+        if error is not None:
+            raise error
+        filepath = os.path.join(folder_path, f"{name}.{format_type}")
+        with timed(stats, 'write'):
+            if store is not None:
+                size = store.save(filepath, content)
+            else:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                    size = f.tell() if stats is not None else 0
+        if stats is not None:
+            stats.file_written(format_type, size)
+        log(f"Saved {label}: {name}")
+        return True
+    except Exception as e:
+        message = f"Error saving {label} {name}: {str(e)}"
+        log(message)
+        if stats is not None:
+            stats.error(message)
+        return False
+
+def save_documents(item, folder_path, name, formats, log=print, stats=None, body_options=None, store=None):
+    """Render a request once and save it to folder_path in each format
+
+    Returns a dict mapping each format to True once saved, False on error
+    and None when the item has nothing to render in that format.
+    """
+    started = time.perf_counter()
+    results = {}
+    for format_type, content, error in render_documents(item, name, formats, stats, body_options):
+        results[format_type] = save_document(folder_path, name, format_type, content, error, log, stats,
+                                             store=store)
+            
+    if stats is not None:
+        stats.count('requests')
+        stats.item_done(os.path.join(folder_path, name), time.perf_counter() - started)
+    return results
+
+def save_environments(item, parents, name, formats, targets, log=print, stats=None, body_options=None,
+                      store=None):
+    """Render a request for every (environment, root_dir) target and save it under each root
+
+    Returns the results of the first target, as save_documents() does.
+    """
+    started = time.perf_counter()
+    roots = {environment: root_dir for environment, root_dir in targets}
+    first = targets[0][0]
+    results = {}
+    for environment, format_type, content, error in render_environments(item, name, formats, roots, stats,
+                                                                             body_options):
+        saved = save_document(os.path.join(roots[environment], *parents), name, format_type, content, error,
+                              log, stats, label=f"{format_type.upper()} ({environment.name})", store=store)
+        if environment is first:
+            results[format_type] = saved
+            
+    if stats is not None:
+        stats.count('requests')
+        stats.item_done('/'.join(parents + (name,)), time.perf_counter() - started)
+    return results
+
+def save_request(item, folder_path, name, format_type, log=print):
+    """Render a request and save it to folder_path in a single format"""
+    return save_documents(item, folder_path, name, [format_type], log)[format_type]
+
+def save_request_txt(item, folder_path, name, log=print):
+    """Save request details to a TXT file"""
+    return save_request(item, folder_path, name, 'txt', log)
+
+def save_request_json(item, folder_path, name, log=print):
+    """Save request details to a JSON file"""
+    return save_request(item, folder_path, name, 'json', log)
+
+def save_request_md(item, folder_path, name, log=print):
+    """Save request details to a Markdown file"""
+    return save_request(item, folder_path, name, 'md', log)
+
+def create_folder(folder_path, name, log=print):
+    """Create a request folder if it does not exist yet"""
+    folder_path = os.path.join(folder_path, name)
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+        log(f"Created folder: {name}")
+
+def write_request(item, folder_path, name, formats, stats=None, body_options=None, store=None):
+    """Save a request and return its results along with the messages it logged"""
+    messages = []
+    results = save_documents(item, folder_path, name, formats, log=messages.append, stats=stats,
+                             body_options=body_options, store=store)
+    return results, messages
+
+def write_environments(item, parents, name, formats, targets, stats=None, body_options=None, store=None):
+    """Save a request for every environment target and return its results and the messages it logged"""
+    messages = []
+    results = save_environments(item, parents, name, formats, targets, log=messages.append, stats=stats,
+                                body_options=body_options, store=store)
+    return results, messages
+
+class OrderedWriter:
+    """Write requests on a bounded thread pool, logging in submission order
+
+    At most queue_size writes are in flight; beyond that request() waits for
+    the oldest one. Messages are always logged in the order the entries were
+    submitted, so the log matches a serial run, and the optional done
+    callback receives the per-format results on the calling thread. With
+    jobs <= 1 every write happens inline.
+    """
+    
+    def __init__(self, jobs=1, log=print, queue_size=None, stats=None, body_options=None, store=None):
+        self.log = log
+        self.stats = stats
+        self.body_options = body_options
+        self.store = store
+        self.queue_size = queue_size or max(jobs, 1) * 4
+        self.pending = deque()
+        self.executor = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        
+    def message(self, message):
+        """Log a message once every write submitted before it has been logged"""
+        if self.executor is None:
+            self.log(message)
+        else:
+            self.pending.append(((None, [message]), None))
+            
+    def folder(self, folder_path, name):
+        create_folder(folder_path, name, log=self.message)
+        
+    def request(self, item, folder_path, name, formats, done=None):
+        self.submit(write_request, item, folder_path, name, formats, self.stats, self.body_options, self.store,
+                    done=done)
+        
+    def submit(self, write, *args, done=None):
+        """Run write(*args), which returns (results, messages), in submission order"""
+        if self.executor is None:
+            self._finish(write(*args), done)
+            return
+        future = self.executor.submit(write, *args)
+        self.pending.append((future, done))
+        while len(self.pending) > self.queue_size:
+            self._flush_one()
+            
+    def _flush_one(self):
+        result, done = self.pending.popleft()
+        if isinstance(result, Future):
+            result = result.result()
+        self._finish(result, done)
+        
+    def _finish(self, result, done):
+        results, messages = result
+        for message in messages:
+            self.log(message)
+        if done is not None:
+            done(results)
+            
+    def close(self):
+        while self.pending:
+            self._flush_one()
+        if self.executor is not None:
+            self.executor.shutdown()
+            
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_items(items, parents=()):
+    """Yield (kind, parents, name, item) for every folder and request, depth first"""
+    for item in items:
+        name = sanitize_name(item.get('name', 'unnamed'))
+        if 'item' in item:
+            yield 'folder', parents, name, item
+            yield from iter_items(item['item'], parents + (name,))
+        else:
+            yield 'request', parents, name, item
+
+def iter_stream_items(events, variables=None):
+    """Turn read_collection events into the same tuples as iter_items"""
+    stack = []
+    for kind, item in events:
+        if kind == 'end':
+            stack.pop()
+            continue
+        if kind == 'variable':
+            if variables is not None and isinstance(item, list):
+                variables.extend(item)
+            continue
+        name = sanitize_name(item.get('name', 'unnamed'))
+        yield kind, tuple(stack), name, item
+        if kind == 'folder':
+            stack.append(name)
+
+def open_collection(collection_file, stream=False, variables=None):
+    """Open a collection and return its name and an iterator over its entries
+
+    With stream=True the file is parsed incrementally, so only the request
+    being written is held in memory. Invalid JSON then surfaces as a
+    JSONDecodeError while iterating rather than from this call.
+    
+    If variables is a list, the collection's variable block is appended to
+    it; with stream=True that happens once the entries are exhausted.
+    
+    collection_file may also be an open text file, which is left open, or
+    an already decoded collection dict.
+    """
+    if isinstance(collection_file, dict):
+        return _collection_entries(collection_file, variables)
+    owned = not hasattr(collection_file, 'read')
+    f = open(collection_file, 'r', encoding='utf-8') if owned else collection_file
+    if not stream:
+        try:
+            collection = json.load(f)
+        finally:
+            if owned:
+                f.close()
+        return _collection_entries(collection, variables)
+
+    events = read_collection(f)
+    try:
+        _, collection_name = next(events)
+    except BaseException:
+        if owned:
+            f.close()
+        raise
+    entries = iter_stream_items(events, variables)
+    return collection_name, _close_after(f, entries) if owned else entries
+
+def _collection_entries(collection, variables):
+    collection_name = collection.get('info', {}).get('name', 'PostmanCollection')
+    if variables is not None and isinstance(collection.get('variable'), list):
+        variables.extend(collection['variable'])
+    return collection_name, iter_items(collection.get('item', []))
+
+def _close_after(f, entries):
+    try:
+        yield from entries
+    finally:
+        f.close()
+
+def write_entry(kind, folder_path, name, item, format_type):
+    """Create a folder or save a request inside folder_path"""
+    if kind == 'folder':
+        create_folder(folder_path, name)
+    else:
+        formats = [f for f in as_formats(format_type) if f in RENDERERS]
+        save_documents(item, folder_path, name, formats)
+
+def write_entries(entries, root_dir, format_type, jobs=1, log=print, manifest=None, stats=None,
+                  environments=None, body_options=None, store=None, journal=None, index=None,
+                  index_root=None):
+    """Create the folders and save the requests of an entry iterator under root_dir
+
+    format_type may be a list of formats; each request is then rendered in
+    all of them from the same traversal. With a manifest, files that were
+    already written from the same source item are skipped and every saved
+    file, sidecars included, is recorded in it.
+    
+    environments is a list of (Environment, root_dir) targets. Each request
+    is then rendered once per environment with its variables filled in and
+    saved under that environment's root_dir instead; manifest is not used.
+    
+    With a ContentStore every file is linked to a single stored copy of
+    its content instead of being written out on its own.
+    
+    With a Journal, requests it lists as written from the same source item
+    are skipped and every request whose files were all saved is added to it.
+    
+    With a SearchIndex, every request is indexed once its files were saved,
+    with the formats that were saved or already up to date, and paths under
+    index_root (default: root_dir, or the first environment's root).
+    """
+    formats = as_formats(format_type)
+    
+    def record(filepaths, digests):
+        def done(results):
+            for fmt, saved in results.items():
+                if saved and fmt in filepaths:
+                    manifest.written(filepaths[fmt], digests[fmt])
+        return done
+        
+    variant = body_options.key() if body_options is not None else ''
+    sidecars = body_options.sidecars() if body_options is not None else []
+    with OrderedWriter(jobs, log=log, stats=stats, body_options=body_options, store=store) as writer:
+        for kind, parents, name, item in entries:
+            folder_path = os.path.join(root_dir, *parents)
+            if kind == 'folder':
+                if environments:
+                    for _, env_root in environments:
+                        writer.folder(os.path.join(env_root, *parents), name)
+                else:
+                    writer.folder(folder_path, name)
+                continue
+                
+            pending = formats
+            callbacks = []
+            if journal is not None:
+                done = journal.check(parents, name, item)
+                if done is None:
+                    pending = []
+                else:
+                    callbacks.append(done)
+            elif manifest is not None and not environments:
+                digests = item_digests(item, formats + sidecars, variant)
+                filepaths = {f: os.path.join(folder_path, f"{name}.{f}") for f in formats + sidecars}
+                pending = [f for f in formats if not manifest.is_current(filepaths[f], digests[f])]
+                if not pending:
+                    # Nothing is rendered again, so the sidecar saved with the documents stays
+                    for sidecar in sidecars:
+                        manifest.is_current(filepaths[sidecar], digests[sidecar])
+                if stats is not None:
+                    stats.count('files_unchanged', len(formats) - len(pending))
+                callbacks.append(record(filepaths, digests))
+            if index is not None:
+                index_dir = index_root or (environments[0][1] if environments else root_dir)
+                callbacks.append(index.request(os.path.join(index_dir, *parents), parents, name, item, formats,
+                                               current=[f for f in formats if f not in pending]))
+            done = _chain(callbacks)
+            
+            if not pending:
+                if done is not None:
+                    done({})
+            elif environments:
+                writer.submit(write_environments, item, parents, name, formats, environments, stats,
+                              body_options, store, done=done)
+            else:
+                writer.request(item, folder_path, name, pending, done=done)
+
+def _chain(callbacks):
+    """Combine done callbacks into one, or None when there are none"""
+    if len(callbacks) <= 1:
+        return callbacks[0] if callbacks else None
+        
+    def done(results):
+        for callback in callbacks:
+            callback(results)
+    return done
+
+Document = namedtuple('Document', ['path', 'format', 'content'])
+
+def _join(*parts):
+    return '/'.join(part for part in parts if part)
+
+def iter_documents(entries, format_type, root='', environments=None, stats=None, events=None,
+                   body_options=None):
+    """Render every request of an entry iterator and yield a Document per file
+
+    Document.path is relative and '/' separated, starts at root and has
+    name collisions resolved exactly as on disk; Document.content is the
+    UTF-8 encoded document. Nothing is written anywhere.
+    
+    events, if given, is called with a dict for every folder ('folder',
+    with path and name), finished request ('request', with path and done)
+    and failed document ('error', with path, format and message), so a
+    caller can show progress without parsing log lines. With a list of
+    bound environments every request is rendered once per environment,
+    under <environment>/<root>.
+    """
+    formats = as_formats(format_type)
+    emit = events or _ignore
+    if environments:
+        prefixes = dict(zip(environments, environment_roots(environments, root)))
+    else:
+        prefixes = {None: root}
+    folders = set()
+    done = 0
+    sidecars = body_options.sidecars() if body_options is not None else []
+    for kind, parents, name, item in WritePlanner(formats, sidecars).plan_entries(entries):
+        if kind == 'folder':
+            for prefix in prefixes.values():
+                path = _join(prefix, *parents, name)
+                if path not in folders:
+                    folders.add(path)
+                    emit({'event': 'folder', 'path': path, 'name': name})
+            continue
+        started = time.perf_counter()
+        if environments:
+            rendered = render_environments(item, name, formats, environments, stats, body_options)
+        else:
+            rendered = ((None,) + document
+                        for document in render_documents(item, name, formats, stats, body_options))
+        for environment, fmt, content, error in rendered:
+            path = _join(prefixes[environment], *parents, f"{name}.{fmt}")
+            if error is not None:
+                label = fmt.upper() if environment is None else f"{fmt.upper()} ({environment.name})"
+                message = f"Error saving {label} {name}: {str(error)}"
+                if stats is not None:
+                    stats.error(message)
+                emit({'event': 'error', 'path': path, 'format': fmt, 'message': message})
+            elif content is not None:
+                yield Document(path, fmt, content.encode('utf-8'))
+        done += 1
+        path = _join(root, *parents, name)
+        if stats is not None:
+            stats.count('requests')
+            stats.item_done(path, time.perf_counter() - started)
+        emit({'event': 'request', 'path': path, 'done': done})
+
+def _ignore(*args):
+    pass
+
+def write_bundle(entries, bundle, root, format_type, log=print, stats=None, events=None, environments=None,
+                 body_options=None):
+    """Render every request of an entry iterator into a bundle or sink
+
+    Paths inside the bundle mirror the folder layout written to disk,
+    starting at root, with name collisions resolved as they are met.
+    Returns the number of documents added.
+    """
+    def on_event(event):
+        if event['event'] == 'folder':
+            bundle.add_folder(event['path'])
+            log(f"Created folder: {event['name']}")
+            if stats is not None:
+                stats.count('folders_created')
+        elif event['event'] == 'error':
+            log(event['message'])
+        if events is not None:
+            events(event)
+            
+    added = 0
+    for document in iter_documents(entries, format_type, root, environments, stats, on_event, body_options):
+        name = document.path.rsplit('/', 1)[-1][:-len(document.format) - 1]
+        label = document.format.upper()
+        try:
+            with timed(stats, 'write'):
+                bundle.add(document.path, document.content)
+        except Exception as e:
+            message = f"Error saving {label} {name}: {str(e)}"
+            log(message)
+            if stats is not None:
+                stats.error(message)
+            continue
+        if stats is not None:
+            stats.file_written(document.format, len(document.content))
+        log(f"Saved {label}: {name}")
+        added += 1
+    return added
+
+class FilesystemSink:
+    """Write documents below root_dir as they are, byte for byte"""
+    
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        
+    def add_folder(self, path):
+        os.makedirs(os.path.join(self.root_dir, *path.split('/')), exist_ok=True)
+        
+    def add(self, path, content):
+        filepath = os.path.join(self.root_dir, *path.split('/'))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(content)
+            
+    def close(self):
+        pass
+
+class MemorySink:
+    """Keep every document in a dict of path -> bytes, for in-process use"""
+    
+    def __init__(self):
+        self.folders = []
+        self.documents = {}
+        
+    def add_folder(self, path):
+        self.folders.append(path)
+        
+    def add(self, path, content):
+        self.documents[path] = content
+        
+    def close(self):
+        pass
+
+class JsonlSink(JsonlBundle):
+    """Write the records of a jsonl bundle to an open text stream, stdout by default"""
+    
+    def __init__(self, stream=None):
+        self.file = stream or sys.stdout
+        
+    def close(self):
+        self.file.flush()
+
+class CallbackSink:
+    """Hand every document to callback(path, content) instead of storing it"""
+    
+    def __init__(self, callback, folder_callback=None):
+        self.callback = callback
+        self.folder_callback = folder_callback or _ignore
+        
+    def add_folder(self, path):
+        self.folder_callback(path)
+        
+    def add(self, path, content):
+        self.callback(path, content)
+        
+    def close(self):
+        pass
+
+def render_collection(collection, sink, format_type='txt', stream=False, environments=None,
+                      stats=None, events=None, log=_ignore, body_options=None):
+    """Render a whole collection into sink and return the collection name
+
+    collection is a file path, an open file or an already decoded
+    collection dict, so an embedding application never has to touch the
+    filesystem. Environments are bound to the collection variables first,
+    which keeps the collection in memory even with stream=True. The sink is
+    closed at the end. See iter_documents for events.
+    """
+    variables = [] if environments else None
+    collection_name, entries = open_collection(collection, stream, variables)
+    if environments:
+        entries = list(entries)
+        collection_variables = variable_values(variables)
+        for environment in environments:
+            environment.bind(collection_variables)
+    try:
+        write_bundle(entries, sink, sanitize_name(collection_name), format_type, log, stats, events,
+                     environments, body_options)
+    finally:
+        sink.close()
+    return collection_name
+
+def process_item(item, current_path, format_type):
+    """Process a collection item (folder or request)"""
+    for kind, parents, name, entry in iter_items([item]):
+        write_entry(kind, os.path.join(current_path, *parents), name, entry, format_type)
+
+def convert_collection(collection_file, output_dir, format_type, stream=False, jobs=1,
+                       incremental=False, prune=False, archive=None, dry_run=False,
+                       stats=None, show_stats=False, stats_json=None, index=None,
+                       environment_files=None, resolve_variables=False, log=print,
+                       progress=None, cancel=None, body_options=None, single=None, dedup=None,
+                       shard=None, atomic=False, resume=False):
+    """Main conversion function
+
+    Output paths are planned in a first pass over the collection, which
+    resolves name collisions and creates every folder up front; a second
+    pass then only writes files. With stream=True the file is read twice
+    instead of being held in memory.
+    
+    Pass a ConversionStats as stats (its hooks receive the numbers at the
+    end), or set show_stats / stats_json to print or save them.
+    
+    With index set to a file path, a SQLite full-text index of every
+    saved request is filled during the write pass (see search_index.py).
+    
+    environment_files are Postman environment files. Every request is then
+    rendered once per environment, from the same traversal, into
+    output_dir/<environment name>/; URLs, headers and bodies have the
+    environment's and the collection's variables filled in. With just
+    resolve_variables the collection variables are filled in.
+    
+    Every message goes to log. progress is called with (done, total)
+    requests while writing, and setting the cancel event stops the run
+    after the writes in flight; it then returns False.
+    
+    body_options is a BodyOptions for sidecar files and pretty-printed
+    JSON bodies. With single set to 'md' or 'html' the whole collection is
+    written into one document instead (see consolidated_output.py).
+    
+    With dedup set to a link mode ('hard', 'symlink' or 'copy') each
+    distinct document is stored once under output_dir and the output files
+    are links to it (see content_store.py). Output that was deduplicated
+    before is always written that way, so files sharing content through a
+    hard link are never overwritten in place.
+    
+    shard is (i, N) to write only the i-th of N deterministic shares of the
+    requests (see conversion_shards.py). Every shard plans the whole
+    collection and creates all of its folders, so shards agree on file
+    names and can share one output directory.
+    
+    With atomic=True the output is built in a staging directory next to
+    the collection folder, which replaces it only once everything was
+    written (see conversion_journal.py). resume=True (which implies atomic)
+    continues an interrupted atomic run, skipping the requests its journal
+    lists as written.
+    """
+    if stats is None and (show_stats or stats_json):
+        stats = ConversionStats()
+        
+    success = _convert_collection(collection_file, output_dir, format_type, stream=stream, jobs=jobs,
+                                  incremental=incremental, prune=prune, archive=archive,
+                                  dry_run=dry_run, stats=stats, index=index,
+                                  environment_files=environment_files,
+                                  resolve_variables=resolve_variables, log=log, progress=progress,
+                                  cancel=cancel, body_options=body_options, single=single,
+                                  dedup=dedup, shard=shard, atomic=atomic, resume=resume)
+    
+    if stats is not None:
+        stats.finish()
+        if show_stats:
+            for line in stats.summary_lines():
+                log(line)
+        if stats_json:
+            stats.write_json(stats_json)
+            log(f"Statistics written to {stats_json}")
+    return success
+
+def _timed_entries(entries, stats, count=False):
+    if stats is None:
+        return entries
+    return stats.iterate(entries, count)
+
+def _convert_collection(collection_file, output_dir, format_type, *, stream, jobs,
+                        incremental, prune, archive, dry_run, stats, index=None,
+                        environment_files=None, resolve_variables=False, log=print,
+                        progress=None, cancel=None, body_options=None, single=None, dedup=None,
+                        shard=None, atomic=False, resume=False):
+    log(f"Converting '{collection_file}' to '{output_dir}'")
+    formats = as_formats(format_type)
+    if single:
+        log(f"Format: {single} (one document with a table of contents)")
+    elif len(formats) == 1:
+        log(f"Format: {formats[0]} (single format only)")
+    else:
+        log(f"Formats: {', '.join(formats)} (rendered in a single pass)")
+    if shard is not None:
+        log(f"Shard: {shard[0]} of {shard[1]}")
+    log("-" * 50)
+    
+    # Load environments
+    try:
+        environments = [load_environment(path) for path in environment_files or []]
+    except (OSError, ValueError) as e:
+        log(f"Error: Cannot read environment file: {str(e)}")
+        return False
+    if resolve_variables and not environments:
+        environments = [Environment('collection')]
+    variables = [] if environments else None
+    
+    # Load collection
+    try:
+        with timed(stats, 'parse'):
+            collection_name, entries = open_collection(collection_file, stream, variables)
+        entries = _timed_entries(entries, stats, count=True)
+    except FileNotFoundError:
+        log(f"Error: Collection file '{collection_file}' not found.")
+        return False
+    except json.JSONDecodeError as e:
+        log(f"Error: Invalid JSON in collection file: {str(e)}")
+        return False
+        
+    log(f"Loaded collection: {collection_name}")
+    
+    if shard is not None and (single or archive or archive_type(output_dir) or output_dir == '-'):
+        log("Error: --shard needs a folder tree as output, not a single document or archive.")
+        return False
+    if shard is not None and (incremental or prune):
+        log("Error: --incremental and --prune cannot be used with --shard.")
+        return False
+    atomic = atomic or resume
+    if atomic and (incremental or prune or shard is not None or environments):
+        log("Error: --atomic and --resume cannot be used with --incremental, --prune, --shard or environments.")
+        return False
+        
+    if single:
+        if environments:
+            log("Error: Environments and variables cannot be used with a single document.")
+            return False
+        path = single_path(output_dir, collection_name, single)
+        if dry_run:
+            log(path)
+            return True
+        if dedup:
+            log("Warning: --dedup is ignored for a single document.")
+        return convert_to_single(entries, collection_name, path, single, stats, log, body_options)
+        
+    archive = archive or archive_type(output_dir) or ('jsonl' if output_dir == '-' else None)
+    if archive and not dry_run:
+        if environments:
+            log("Error: Environments and variables cannot be used with archive output.")
+            return False
+        if index:
+            log("Warning: --index is ignored for archive output.")
+        if dedup:
+            log("Warning: --dedup is ignored for archive output.")
+        if atomic:
+            log("Warning: --atomic and --resume are ignored for archive output.")
+        return convert_to_archive(entries, collection_name, output_dir, format_type, archive,
+                                  incremental or prune, stats, log, body_options)
+        
+    # Plan every output path
+    try:
+        if not stream:
+            entries = list(entries)
+        with timed(stats, 'plan'):
+            plan = compile_plan(entries, formats, body_options.sidecars() if body_options is not None else [])
+    except json.JSONDecodeError as e:
+        log(f"Error: Invalid JSON in collection file: {str(e)}")
+        return False
+    for source, planned in plan.collisions:
+        log(f"Renamed: {source} -> {planned}")
+        
+    # One output root per environment; the variable block is known once the entries were read
+    collection_variables = variable_values(variables)
+    for environment in environments:
+        environment.bind(collection_variables)
+    roots = environment_roots(environments, sanitize_name(collection_name)) if environment_files \
+        else [sanitize_name(collection_name)]
+        
+    if dry_run:
+        for root in roots:
+            for path in plan.paths() if shard is None else shard_paths(plan, shard):
+                log(f"{root}/{path}")
+        log("-" * 50)
+        log(plan.summary())
+        return True
+        
+    # Create main output directories
+    root_dirs = [os.path.join(output_dir, root) for root in roots]
+    staged = None
+    if atomic:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        staged = StagedOutput(output_dir, roots[0], formats, body_options.key() if body_options else '', resume)
+        if staged.resumed:
+            log(f"Resuming the interrupted conversion in {staged.path}")
+    write_dirs = [staged.path] if staged is not None else root_dirs
+    for root, write_dir in zip(roots, write_dirs):
+        Path(write_dir).mkdir(parents=True, exist_ok=True)
+        log(f"Created main directory: {root}")
+        with timed(stats, 'mkdir'):
+            created = plan.create_directories(write_dir, log=log)
+        if stats is not None:
+            stats.count('folders_created', created)
+    main_output_dir = root_dirs[0]
+    write_dir = write_dirs[0]
+    targets = list(zip(environments, root_dirs)) if environments else None
+        
+    if targets and (incremental or prune):
+        log("Warning: --incremental and --prune are ignored when resolving variables.")
+    manifest = Manifest(main_output_dir) if (incremental or prune) and not targets else None
+    try:
+        search_index = SearchIndex(index) if index else None
+    except (OSError, RuntimeError, sqlite3.Error) as e:
+        log(f"Error: Cannot create index '{index}': {str(e)}")
+        return False
+    if not dedup and has_store(output_dir):
+        log("Output was deduplicated before; linking to the content store again.")
+        dedup = 'hard'
+    store = ContentStore(output_dir, dedup) if dedup else None
+    sources = {}
+        
+    # Process items
+    try:
+        if stream:
+            _, entries = open_collection(collection_file, stream)
+            entries = _timed_entries(entries, stats)
+        requests = plan.apply(entries)
+        total = len(plan.requests)
+        if shard is not None:
+            variant = '\0'.join([body_options.key() if body_options is not None else '', dedup or '']
+                                + [environment.digest() for environment in environments])
+            requests = shard_entries(requests, shard, sources, formats, variant)
+            total = len(shard_requests(plan, shard))
+        if progress is not None or cancel is not None:
+            requests = _track(requests, total, progress, cancel)
+        write_entries(requests, write_dir, format_type, jobs, log=log, manifest=manifest,
+                      stats=stats, environments=targets, body_options=body_options, store=store,
+                      journal=staged.journal if staged is not None else None, index=search_index,
+                      index_root=main_output_dir)
+    except ValueError as e:
+        # JSONDecodeError while streaming, or the file changed between the two passes
+        if isinstance(e, json.JSONDecodeError):
+            log(f"Error: Invalid JSON in collection file: {str(e)}")
+        else:
+            log(f"Error: {str(e)}")
+        if manifest is not None:
+            manifest.finish(log=log)
+        if search_index is not None:
+            search_index.discard()
+        if staged is not None:
+            staged.abort()
+        return False
+        
+    log("-" * 50)
+    if cancel is not None and cancel.is_set():
+        if manifest is not None:
+            manifest.finish(log=log)
+        if search_index is not None:
+            search_index.discard()
+        if staged is not None:
+            staged.abort()
+        log("Conversion cancelled.")
+        return False
+    if manifest is not None:
+        manifest.finish(prune, log=log)
+        log(manifest.summary())
+    if staged is not None:
+        log(staged.journal.summary())
+        failed = staged.journal.unfinished(total)
+        if failed:
+            # Keep the previous output and the staging directory for --resume
+            staged.abort()
+            if search_index is not None:
+                search_index.discard()
+            log(f"Error: {failed} requests could not be saved; the output was not moved into place. "
+                f"Run again with --resume to retry them.")
+            return False
+        staged.finish(plan, SIDECAR_FORMATS, log=log)
+    if store is not None:
+        log(store.summary())
+        if stats is not None:
+            stats.count('bytes_deduplicated', store.bytes_saved)
+    if search_index is not None:
+        with timed(stats, 'index'):
+            search_index.close()
+        log(f"Index: {search_index.count} requests written to {index}")
+    for environment in environments:
+        log(environment.summary())
+    if shard is not None:
+        path = write_shard_manifest(output_dir, shard, plan, roots, sources, SIDECAR_FORMATS)
+        log(f"Shard {shard[0]} of {shard[1]}: {total} of {len(plan.requests)} requests, recorded in {path}")
+    log("Conversion completed successfully!")
+    return True
+
+def single_path(output_dir, collection_name, kind):
+    """output_dir itself if it ends in .md or .html, else <collection>.<kind> inside it"""
+    if output_dir.lower().endswith('.' + kind):
+        return output_dir
+    return os.path.join(output_dir, f"{sanitize_name(collection_name)}.{kind}")
+
+def convert_to_single(entries, collection_name, path, kind, stats=None, log=print, body_options=None):
+    """Stream the collection into one Markdown or HTML document at path"""
+    # Imported here because consolidated_output builds on this module
+    from consolidated_output import write_consolidated
+    
+    log(f"Writing single {kind} document: {path}")
+    try:
+        write_consolidated(entries, path, kind, collection_name, log, stats, body_options)
+    except json.JSONDecodeError as e:
+        log(f"Error: Invalid JSON in collection file: {str(e)}")
+        return False
+        
+    log("-" * 50)
+    log("Conversion completed successfully!")
+    return True
+
+def _track(entries, total, progress, cancel):
+    """Report (done, total) after every entry and stop early once cancel is set"""
+    if progress is not None:
+        progress(0, total)
+    for done, entry in enumerate(entries, 1):
+        if cancel is not None and cancel.is_set():
+            return
+        yield entry
+        if progress is not None:
+            progress(done, total)
+
+def environment_roots(environments, collection_root):
+    """Return a distinct <environment>/<collection> output root for every environment"""
+    roots = []
+    used = set()
+    for environment in environments:
+        base = sanitize_name(environment.name) or 'environment'
+        name = base
+        counter = 2
+        while name.lower() in used:
+            name = f"{base}_{counter}"
+            counter += 1
+        used.add(name.lower())
+        roots.append(f"{name}/{collection_root}")
+    return roots
+
+def convert_to_archive(entries, collection_name, output_dir, format_type, archive, incremental=False,
+                       stats=None, log=print, body_options=None):
+    """Stream the collection into a single archive at output_dir, or as JSONL to stdout for '-'"""
+    if incremental:
+        log("Warning: --incremental and --prune are ignored for archive output.")
+    if output_dir == '-':
+        bundle = JsonlSink()
+    else:
+        bundle_path = archive_path(output_dir, archive)
+        bundle = open_bundle(bundle_path, archive)
+        log(f"Writing {archive} archive: {bundle_path}")
+    
+    try:
+        write_bundle(entries, bundle, sanitize_name(collection_name), format_type, log=log, stats=stats,
+                     body_options=body_options)
+    except json.JSONDecodeError as e:
+        log(f"Error: Invalid JSON in collection file: {str(e)}")
+        return False
+    finally:
+        bundle.close()
+        
+    log("-" * 50)
+    log("Conversion completed successfully!")
+    return True
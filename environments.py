@@ -0,0 +1,206 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+
+# {{name}}; the name is captured without surrounding whitespace
+VARIABLE_PATTERN = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}')
+MAX_NESTING = 5
+
+
+class Template:
+    """A string split into literal text and variable names, ready to be filled in
+
+    parts alternates literal text and variable names, starting and ending
+    with literal text, as returned by VARIABLE_PATTERN.split().
+    """
+    __slots__ = ('parts',)
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def render(self, variables, missing):
+        """Fill in the variables, adding the names that have no value to missing"""
+        parts = list(self.parts)
+        for i in range(1, len(parts), 2):
+            value = variables.get(parts[i])
+            if value is None:
+                missing.add(parts[i])
+                parts[i] = '{{' + parts[i] + '}}'
+            else:
+                parts[i] = value
+        return ''.join(parts)
+
+
+def compile_template(text):
+    """Return a Template for text, or text itself when it has no variables"""
+    if not isinstance(text, str) or '{{' not in text:
+        return text
+    parts = VARIABLE_PATTERN.split(text)
+    if len(parts) == 1:
+        return text
+    return Template(parts)
+
+
+def render_value(value, variables, missing):
+    if isinstance(value, Template):
+        return value.render(variables, missing)
+    return value
+
+
+def _as_text(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def variable_values(values):
+    """Turn a Postman variable list ([{"key": ..., "value": ...}]) into a dict"""
+    variables = {}
+    for value in values if isinstance(values, list) else []:
+        if isinstance(value, dict) and 'key' in value and value.get('enabled', True) is not False:
+            variables[str(value['key'])] = _as_text(value.get('value', ''))
+    return variables
+
+
+class Environment:
+    """A named set of variable values that requests are rendered with
+
+    bind() merges in the collection variables (the environment wins, as in
+    Postman) and resolves variables that refer to other variables. Which
+    variables requests used without a value is counted in unresolved; that
+    may be updated from several writer threads.
+    """
+
+    def __init__(self, name, values=None):
+        self.name = name
+        self.values = dict(values or {})
+        self.variables = dict(self.values)
+        self.unresolved = {}
+        self._lock = threading.Lock()
+
+    def bind(self, collection_variables):
+        variables = dict(collection_variables)
+        variables.update(self.values)
+        for _ in range(MAX_NESTING):
+            nested = {key: value for key, value in variables.items() if '{{' in value}
+            if not nested:
+                break
+            for key, value in nested.items():
+                variables[key] = render_value(compile_template(value), variables, set())
+        self.variables = variables
+
+    def digest(self):
+        """Hash the name and variable values requests are rendered with"""
+        data = json.dumps([self.name, sorted(self.variables.items())], ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def report(self, missing):
+        # Postman's dynamic variables ({{$guid}}, ...) are filled in at send time
+        missing = [name for name in missing if not name.startswith('$')]
+        if missing:
+            with self._lock:
+                for name in missing:
+                    self.unresolved[name] = self.unresolved.get(name, 0) + 1
+
+    def summary(self):
+        if not self.unresolved:
+            return f"Environment {self.name}: all variables resolved"
+        names = ", ".join(f"{name} ({count} requests)" for name, count in sorted(self.unresolved.items()))
+        return f"Environment {self.name}: unresolved variables: {names}"
+
+
+def load_environment(path):
+    """Read a Postman environment file into an Environment"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    name = data.get('name') or os.path.splitext(os.path.basename(path))[0]
+    return Environment(name, variable_values(data.get('values', [])))
+
+
+class CompiledRequest:
+    """The URL, headers and body of one RequestRecord compiled into templates
+
+    Compiled once per request; render() then only fills in each
+    environment's values and returns a copy of the record.
+    """
+    __slots__ = ('record', 'url', 'headers', 'body_raw', 'body_fields', 'body_graphql')
+
+    def __init__(self, record):
+        self.record = record
+        self.url = compile_template(record.url)
+        self.headers = _compile_pairs(record.headers)
+        self.body_raw = compile_template(record.body_raw)
+        self.body_fields = None
+        if record.body_fields is not None:
+            self.body_fields = tuple((key, compile_template(value), kind) for key, value, kind in record.body_fields)
+        self.body_graphql = _compile_pairs([record.body_graphql])[0] if record.body_graphql else None
+
+    def render(self, variables, missing):
+        record = copy.copy(self.record)
+        record.url = render_value(self.url, variables, missing)
+        record.headers = _render_pairs(self.headers, variables, missing)
+        record.body_raw = render_value(self.body_raw, variables, missing)
+        record.body_text = None
+        if self.body_fields is not None:
+            record.body_fields = tuple((key, render_value(value, variables, missing), kind)
+                                       for key, value, kind in self.body_fields)
+        if self.body_graphql is not None:
+            record.body_graphql = _render_pairs([self.body_graphql], variables, missing)[0]
+        if record.item is not None:
+            record.item = _render_item(record.item, record)
+        return record
+
+
+def _render_item(item, record):
+    """Return a copy of the source item with the rendered URL, headers and body of record
+
+    Only the dicts on the way to a rendered field are copied; the rest is
+    shared with the source item.
+    """
+    request = dict(item['request'])
+    if isinstance(request.get('url'), dict):
+        request['url'] = dict(request['url'], raw=record.url)
+    headers = request.get('header')
+    if isinstance(headers, list) and len(headers) == len(record.headers):
+        request['header'] = [dict(header, key=key, value=value) if isinstance(header, dict) else header
+                             for header, (key, value) in zip(headers, record.headers)]
+    body = request.get('body')
+    if isinstance(body, dict):
+        body = request['body'] = dict(body)
+        if record.body_raw is not None:
+            body['raw'] = record.body_raw
+        if record.body_graphql is not None and isinstance(body.get('graphql'), dict):
+            query, variables = record.body_graphql
+            body['graphql'] = dict(body['graphql'], query=query, variables=variables)
+        mode = body.get('mode')
+        if record.body_fields is not None and isinstance(body.get(mode), list):
+            body[mode] = _render_fields(body[mode], record.body_fields)
+    return dict(item, request=request)
+
+
+def _render_fields(fields, rendered):
+    """Copy formdata or urlencoded fields with the rendered values of the enabled ones
+
+    rendered holds one (key, value, type) per enabled field, in order, as
+    RequestRecord reads them.
+    """
+    rendered = iter(rendered)
+    copied = []
+    for field in fields:
+        if isinstance(field, dict) and not field.get('disabled'):
+            _, value, kind = next(rendered)
+            source = 'src' if kind == 'file' else 'value'
+            if isinstance(field.get(source), str):
+                field = dict(field, **{source: value})
+        copied.append(field)
+    return copied
+
+
+def _compile_pairs(pairs):
+    return tuple((compile_template(first), compile_template(second)) for first, second in pairs)
+
+
+def _render_pairs(pairs, variables, missing):
+    return tuple((render_value(first, variables, missing), render_value(second, variables, missing))
+                 for first, second in pairs)
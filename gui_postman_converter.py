@@ -1,8 +1,16 @@
-import json
 import os
+import queue
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 
+from collection_watch import CollectionWatcher
+from converter_core import FORMATS, convert_collection
+
+MAX_LOG_LINES = 2000  # older lines are dropped from the log area
+POLL_INTERVAL_MS = 100
+MAX_EVENTS_PER_POLL = 5000
+
 class PostmanConverterGUI:
     def __init__(self, root):
         self.root = root
@@ -14,8 +22,20 @@ class PostmanConverterGUI:
         self.collection_path = tk.StringVar(value="d:/printify_postman_collection.json")
         self.output_path = tk.StringVar()
         self.format_var = tk.StringVar(value="md")  # Default to Markdown
+        self.stream_var = tk.BooleanVar(value=False)
+        self.jobs_var = tk.IntVar(value=1)
+        self.live_sync_var = tk.BooleanVar(value=False)
+        
+        # Worker state; the worker thread only talks to the UI through self.events
+        self.events = queue.Queue()
+        self.worker = None
+        self.cancel_event = threading.Event()
+        self.closing = False
+        self.watch_stop = None
         
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(POLL_INTERVAL_MS, self.poll_events)
         
     def create_widgets(self):
         # Main frame
@@ -57,15 +77,38 @@ class PostmanConverterGUI:
         tk.Radiobutton(format_container, text="Plain Text (.txt)", variable=self.format_var, value="txt").pack(anchor=tk.W)
         tk.Radiobutton(format_container, text="JSON (.json)", variable=self.format_var, value="json").pack(anchor=tk.W)
         tk.Radiobutton(format_container, text="Markdown (.md)", variable=self.format_var, value="md").pack(anchor=tk.W)
+        tk.Radiobutton(format_container, text="All three in one pass", variable=self.format_var, value="all").pack(anchor=tk.W)
+        
+        # Options
+        options_frame = tk.LabelFrame(main_frame, text="Options", padx=10, pady=10)
+        options_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        tk.Checkbutton(options_frame, text="Stream large collections (low memory)",
+                       variable=self.stream_var).pack(anchor=tk.W)
+        
+        jobs_frame = tk.Frame(options_frame)
+        jobs_frame.pack(anchor=tk.W)
+        tk.Label(jobs_frame, text="Parallel jobs:").pack(side=tk.LEFT)
+        tk.Spinbox(jobs_frame, from_=1, to=64, width=5, textvariable=self.jobs_var).pack(side=tk.LEFT, padx=(5, 0))
+        
+        tk.Checkbutton(options_frame, text="Live sync (rewrite changed requests whenever the file is saved)",
+                       variable=self.live_sync_var, command=self.toggle_live_sync).pack(anchor=tk.W)
+        
+        # Convert and cancel buttons
+        button_frame = tk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(0, 15))
         
-        # Convert button
-        convert_btn = tk.Button(main_frame, text="Convert Collection", 
-                               command=self.convert, bg="#4CAF50", fg="white",
-                               font=("Arial", 12, "bold"), height=2)
-        convert_btn.pack(fill=tk.X, pady=(0, 15))
+        self.convert_btn = tk.Button(button_frame, text="Convert Collection", 
+                                     command=self.convert, bg="#4CAF50", fg="white",
+                                     font=("Arial", 12, "bold"), height=2)
+        self.convert_btn.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        self.cancel_btn = tk.Button(button_frame, text="Cancel", command=self.cancel,
+                                    font=("Arial", 12, "bold"), height=2, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.RIGHT, padx=(10, 0))
         
         # Progress bar
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
+        self.progress = ttk.Progressbar(main_frame, mode='determinate')
         self.progress.pack(fill=tk.X, pady=(0, 15))
         
         # Log area
@@ -97,146 +140,50 @@ class PostmanConverterGUI:
             self.status_var.set(f"Selected output directory: {os.path.basename(directory)}")
             
     def log(self, message):
-        self.log_area.insert(tk.END, message + "\n")
-        self.log_area.see(tk.END)
-        self.root.update_idletasks()
-        
-    def sanitize_name(self, name):
-        """Remove invalid characters for folder/file names"""
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            name = name.replace(char, '_')
-        return name.strip()
-        
-    def save_request_txt(self, item, folder_path, name):
-        """Save request details to a TXT file"""
-        if 'request' not in item:
-            return
-            
-        request = item['request']
-        filename = f"{name}.txt"
-        filepath = os.path.join(folder_path, filename)
+        """Queue a log line; safe to call from the worker thread"""
+        self.events.put(('log', message))
         
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"API Endpoint: {name}\n")
-                f.write("=" * 50 + "\n")
-                f.write(f"Method: {request.get('method', 'N/A')}\n")
-                f.write(f"URL: {request.get('url', {}).get('raw', 'N/A')}\n\n")
-                
-                description = request.get('description', '').strip()
-                if description:
-                    f.write("Description:\n")
-                    f.write(description + "\n\n")
-                    
-                # Headers
-                headers = request.get('header', [])
-                if headers:
-                    f.write("Headers:\n")
-                    for header in headers:
-                        key = header.get('key', '')
-                        value = header.get('value', '')
-                        f.write(f"  {key}: {value}\n")
-                    f.write("\n")
-                    
-                # Body (if present)
-                body = request.get('body')
-                if body:
-                    f.write("Body:\n")
-                    if body.get('mode') == 'raw':
-                        f.write(body.get('raw', '') + "\n")
-                    f.write("\n")
-                    
-            self.log(f"Saved TXT: {name}")
-        except Exception as e:
-            self.log(f"Error saving TXT {name}: {str(e)}")
-            
-    def save_request_json(self, item, folder_path, name):
-        """Save request details to a JSON file"""
-        filename = f"{name}.json"
-        filepath = os.path.join(folder_path, filename)
+    def append_log(self, lines):
+        """Append a batch of lines and drop the oldest beyond MAX_LOG_LINES"""
+        self.log_area.insert(tk.END, "\n".join(lines) + "\n")
+        line_count = int(self.log_area.index('end-1c').split('.')[0]) - 1
+        if line_count > MAX_LOG_LINES:
+            self.log_area.delete('1.0', f"{line_count - MAX_LOG_LINES + 1}.0")
+        self.log_area.see(tk.END)
         
+    def poll_events(self):
+        """Drain the worker's events in one batch and reschedule"""
+        lines = []
+        progress = None
+        finished = None
         try:
-            # Pretty print the entire item
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(item, f, indent=2, ensure_ascii=False)
-            self.log(f"Saved JSON: {name}")
-        except Exception as e:
-            self.log(f"Error saving JSON {name}: {str(e)}")
-            
-    def save_request_md(self, item, folder_path, name):
-        """Save request details to a Markdown file"""
-        if 'request' not in item:
-            return
+            for _ in range(MAX_EVENTS_PER_POLL):
+                event = self.events.get_nowait()
+                if event[0] == 'log':
+                    lines.append(event[1])
+                elif event[0] == 'progress':
+                    progress = event[1:]
+                else:
+                    finished = event
+                    break
+        except queue.Empty:
+            pass
             
-        request = item['request']
-        filename = f"{name}.md"
-        filepath = os.path.join(folder_path, filename)
-        
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"# {name}\n\n")
-                f.write(f"**Method:** `{request.get('method', 'N/A')}`  \n")
-                f.write(f"**URL:** `{request.get('url', {}).get('raw', 'N/A')}`\n\n")
-                
-                description = request.get('description', '').strip()
-                if description:
-                    f.write(f"## Description\n{description}\n\n")
-                    
-                # Headers
-                headers = request.get('header', [])
-                if headers:
-                    f.write("## Headers\n")
-                    f.write("| Key | Value |\n|-----|-------|\n")
-                    for header in headers:
-                        key = header.get('key', '')
-                        value = header.get('value', '')
-                        f.write(f"| {key} | {value} |\n")
-                    f.write("\n")
-                    
-                # Body (if present)
-                body = request.get('body')
-                if body:
-                    f.write("## Body\n")
-                    if body.get('mode') == 'raw':
-                        raw_body = body.get('raw', '')
-                        f.write("```json\n")
-                        f.write(raw_body + "\n")
-                        f.write("```\n")
-                    f.write("\n")
-                    
-            self.log(f"Saved MD: {name}")
-        except Exception as e:
-            self.log(f"Error saving MD {name}: {str(e)}")
-            
-    def process_item(self, item, current_path, format_type):
-        """Process a collection item (folder or request)"""
-        name = self.sanitize_name(item.get('name', 'unnamed'))
-        
-        if 'item' in item:
-            # This is a folder
-            folder_path = os.path.join(current_path, name)
-            if not os.path.exists(folder_path):
-                os.makedirs(folder_path)
-                self.log(f"Created folder: {name}")
-                
-            # Process children
-            for child in item['item']:
-                self.process_item(child, folder_path, format_type)
-        else:
-            # This is a request
-            # Save in the specified format only
-            if format_type == 'txt':
-                self.save_request_txt(item, current_path, name)
-            elif format_type == 'json':
-                self.save_request_json(item, current_path, name)
-            elif format_type == 'md':
-                self.save_request_md(item, current_path, name)
-                
-    def convert(self):
-        """Main conversion function"""
-        self.log_area.delete(1.0, tk.END)
+        if lines:
+            self.append_log(lines)
+        if progress is not None:
+            done, total = progress
+            self.progress.configure(maximum=max(total, 1), value=done)
+            self.status_var.set(f"Converting... {done}/{total} items")
+        if finished is not None:
+            self.finish(*finished[1:])
+            if self.closing:
+                # finish() destroyed the window; there is nothing left to poll
+                return
+        self.root.after(POLL_INTERVAL_MS, self.poll_events)
         
+    def read_inputs(self):
+        """Return (collection_file, output_dir, format_type, jobs), or None after showing an error"""
         collection_file = self.collection_path.get().strip()
         output_dir = self.output_path.get().strip()
         format_type = self.format_var.get()
@@ -255,51 +202,122 @@ class PostmanConverterGUI:
             return
             
         try:
-            self.status_var.set("Converting...")
-            self.progress.start()
-            self.root.update_idletasks()
-            
-            self.log("Starting conversion...")
-            self.log(f"Collection: {collection_file}")
-            self.log(f"Output: {output_dir}")
-            self.log(f"Format: {format_type.upper()}")
-            self.log("-" * 50)
+            jobs = self.jobs_var.get()
+        except tk.TclError:
+            messagebox.showerror("Error", "Parallel jobs must be a number.")
+            return
+        return collection_file, output_dir, format_type, jobs
+        
+    def convert(self):
+        """Validate the inputs and start the conversion on a worker thread"""
+        if self.worker is not None or self.watch_stop is not None:
+            return
+        self.log_area.delete(1.0, tk.END)
+        
+        inputs = self.read_inputs()
+        if inputs is None:
+            return
+        collection_file, output_dir, format_type, jobs = inputs
             
-            # Load collection
-            with open(collection_file, 'r', encoding='utf-8') as f:
-                collection = json.load(f)
-                
-            collection_name = collection.get('info', {}).get('name', 'PostmanCollection')
-            self.log(f"Loaded collection: {collection_name}")
+        self.status_var.set("Converting...")
+        self.progress.configure(value=0)
+        self.convert_btn.configure(state=tk.DISABLED)
+        self.cancel_btn.configure(state=tk.NORMAL)
+        self.cancel_event.clear()
+        
+        self.worker = threading.Thread(
+            target=self.run_conversion,
+            args=(collection_file, output_dir, format_type, self.stream_var.get(), jobs),
+            daemon=True)
+        self.worker.start()
+        
+    def toggle_live_sync(self):
+        """Start or stop keeping the output in sync with the collection file"""
+        if not self.live_sync_var.get():
+            if self.watch_stop is not None:
+                self.watch_stop.set()
+                self.watch_stop = None
+            self.convert_btn.configure(state=tk.NORMAL)
+            self.status_var.set("Ready")
+            return
             
-            # Create main output directory
-            main_output_dir = os.path.join(output_dir, self.sanitize_name(collection_name))
-            os.makedirs(main_output_dir, exist_ok=True)
-            self.log(f"Created main directory: {os.path.basename(main_output_dir)}")
+        inputs = None if self.worker is not None else self.read_inputs()
+        if inputs is None:
+            self.live_sync_var.set(False)
+            return
+        collection_file, output_dir, format_type, jobs = inputs
+        formats = FORMATS if format_type == 'all' else [format_type]
+        
+        self.log_area.delete(1.0, tk.END)
+        self.convert_btn.configure(state=tk.DISABLED)
+        self.status_var.set(f"Live sync: watching {os.path.basename(collection_file)}")
+        self.watch_stop = threading.Event()
+        watcher = CollectionWatcher(collection_file, output_dir, formats, jobs=jobs, log=self.log)
+        threading.Thread(target=watcher.watch, args=(self.watch_stop,), daemon=True).start()
+        
+    def cancel(self):
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.status_var.set("Cancelling...")
+            self.cancel_btn.configure(state=tk.DISABLED)
             
-            # Process items
-            if 'item' in collection:
-                for item in collection['item']:
-                    self.process_item(item, main_output_dir, format_type)
-                    
-            self.log("-" * 50)
-            self.log("Conversion completed successfully!")
-            self.status_var.set("Conversion completed!")
-            messagebox.showinfo("Success", "Collection converted successfully!")
+    def on_close(self):
+        """Stop a running conversion before closing the window"""
+        if self.watch_stop is not None:
+            self.watch_stop.set()
+        if self.worker is None:
+            self.root.destroy()
+            return
+        self.closing = True
+        self.cancel()
+        
+    def report_progress(self, done, total):
+        self.events.put(('progress', done, total))
+        
+    def run_conversion(self, collection_file, output_dir, format_type, stream, jobs):
+        """Worker thread body: convert and report back through self.events"""
+        errors = []
+        
+        def log(message):
+            if message.startswith("Error: "):
+                errors.append(message[len("Error: "):])
+            self.log(message)
             
-        except json.JSONDecodeError as e:
-            error = f"Invalid JSON in collection file: {str(e)}"
-            self.log(error)
-            messagebox.showerror("Error", error)
+        try:
+            formats = FORMATS if format_type == 'all' else [format_type]
+            success = convert_collection(collection_file, output_dir, formats, stream=stream, jobs=jobs,
+                                         show_stats=True, log=log, progress=self.report_progress,
+                                         cancel=self.cancel_event)
+            if self.cancel_event.is_set():
+                self.events.put(('finished', 'cancelled', None))
+            elif success:
+                self.events.put(('finished', 'success', None))
+            else:
+                self.events.put(('finished', 'error', errors[-1] if errors else "Conversion failed"))
+                
         except Exception as e:
             error = f"Conversion failed: {str(e)}"
             self.log(error)
+            self.events.put(('finished', 'error', error))
+            
+    def finish(self, outcome, error):
+        """Reset the controls once the worker has reported its outcome"""
+        self.worker.join()
+        self.worker = None
+        if self.closing:
+            self.root.destroy()
+            return
+        self.convert_btn.configure(state=tk.NORMAL)
+        self.cancel_btn.configure(state=tk.DISABLED)
+        self.status_var.set("Ready")
+        if outcome == 'success':
+            messagebox.showinfo("Success", "Collection converted successfully!")
+        elif outcome == 'cancelled':
+            messagebox.showinfo("Cancelled", "Conversion was cancelled.")
+        else:
             messagebox.showerror("Error", error)
-        finally:
-            self.progress.stop()
-            self.status_var.set("Ready")
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = PostmanConverterGUI(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
@@ -0,0 +1,172 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+INDEX_COLUMNS = ['name', 'folder', 'method', 'url', 'headers', 'description', 'body']
+BATCH_SIZE = 1000
+
+
+def _text(value):
+    """Flatten a description or similar field, which may be a string or {"content": ...}"""
+    if isinstance(value, dict):
+        value = value.get('content', '')
+    return value if isinstance(value, str) else ''
+
+
+def _pairs(values):
+    lines = []
+    for value in values if isinstance(values, list) else []:
+        if isinstance(value, dict):
+            lines.append(f"{value.get('key', '')}: {value.get('value', value.get('src', ''))}")
+    return "\n".join(lines)
+
+
+def index_fields(parents, name, item):
+    """Extract the searchable text of one request item, tolerating malformed items"""
+    request = item.get('request', {})
+    if not isinstance(request, dict):
+        request = {}
+    url = request.get('url', '')
+    if isinstance(url, dict):
+        url = url.get('raw', '')
+    body = request.get('body')
+    if isinstance(body, dict):
+        mode = body.get('mode', 'raw')
+        if mode == 'raw':
+            body = body.get('raw', '')
+        elif mode == 'graphql':
+            graphql = body.get('graphql', {})
+            body = graphql.get('query', '') if isinstance(graphql, dict) else ''
+        else:
+            body = _pairs(body.get(mode))
+    return (
+        name,
+        '/'.join(parents),
+        str(request.get('method', '')),
+        url if isinstance(url, str) else '',
+        _pairs(request.get('header')),
+        _text(request.get('description', item.get('description'))),
+        body if isinstance(body, str) else '',
+    )
+
+
+class SearchIndex:
+    """SQLite full-text index of the requests written by one conversion
+
+    Rows are inserted in batches inside a single transaction into a
+    temporary database, which replaces path only when close() is called, so
+    a failed run leaves the previous index in place.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.batch_size = batch_size
+        self.rows = []
+        self.count = 0
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        self.db = sqlite3.connect(self.tmp_path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        try:
+            self.db.execute(f"CREATE VIRTUAL TABLE endpoints USING fts5("
+                            f"path UNINDEXED, formats UNINDEXED, {', '.join(INDEX_COLUMNS)})")
+        except sqlite3.OperationalError as e:
+            self.db.close()
+            os.remove(self.tmp_path)
+            raise RuntimeError(f"SQLite FTS5 is not available: {str(e)}") from None
+        self.db.execute("BEGIN")
+
+    def add(self, folder_path, parents, name, item, formats):
+        self.rows.append((os.path.join(folder_path, name), ','.join(formats))
+                         + index_fields(parents, name, item))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.db.executemany(f"INSERT INTO endpoints VALUES ({', '.join('?' * (len(INDEX_COLUMNS) + 2))})",
+                                self.rows)
+            self.count += len(self.rows)
+            self.rows = []
+
+    def request(self, folder_path, parents, name, item, formats, current=()):
+        """Return a done callback that indexes a request once its documents are saved
+
+        Only the formats that were saved, or were already current and not
+        written again, are recorded; a request with neither is left out.
+        """
+        def done(results):
+            saved = [f for f in formats if f in current or results.get(f)]
+            if saved:
+                self.add(folder_path, parents, name, item, saved)
+        return done
+
+    def close(self):
+        self.flush()
+        self.db.execute("COMMIT")
+        self.db.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self.db.close()
+        os.remove(self.tmp_path)
+
+
+def match_expression(terms, field=None):
+    """Turn plain search terms into an FTS5 query: every term must appear as a prefix"""
+    phrases = ['"' + term.replace('"', '""') + '"*' for term in terms]
+    expression = ' AND '.join(phrases)
+    if field:
+        expression = f"{field} : ({expression})"
+    return expression
+
+
+def search(index_path, terms, field=None, limit=50, raw=False):
+    """Return (path, format list, method, url) rows matching terms, best match first"""
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(f"Index '{index_path}' not found")
+    expression = ' '.join(terms) if raw else match_expression(terms, field)
+    db = sqlite3.connect(index_path)
+    try:
+        return db.execute("SELECT path, formats, method, url FROM endpoints WHERE endpoints MATCH ? "
+                          "ORDER BY rank LIMIT ?", (expression, limit)).fetchall()
+    finally:
+        db.close()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Find converted requests in an index built with --index")
+    parser.add_argument('index', help="Index database written by single_format_converter.py --index")
+    parser.add_argument('terms', nargs='+', help="Words or URL fragments that must all match")
+    parser.add_argument('--field', choices=INDEX_COLUMNS, help="Only search this field")
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--raw', action='store_true', help="Pass the terms through as an FTS5 query")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Also show method, URL and query time")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    try:
+        rows = search(args.index, args.terms, args.field, args.limit, args.raw)
+    except (FileNotFoundError, sqlite3.Error) as e:
+        print(f"Error: {str(e)}")
+        return False
+    for path, formats, method, url in rows:
+        for format_type in formats.split(','):
+            if args.verbose:
+                print(f"{path}.{format_type}  {method} {url}")
+            else:
+                print(f"{path}.{format_type}")
+    if args.verbose:
+        print(f"{len(rows)} matches in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return bool(rows)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
@@ -1,188 +1,155 @@
-import json
-import os
+import argparse
 import sys
-from pathlib import Path
 
-def sanitize_name(name):
-    """Remove invalid characters for folder/file names"""
-    invalid_chars = '<>:"/\\|?*'
-    for char in invalid_chars:
-        name = name.replace(char, '_')
-    return name.strip()
-
-def save_request_txt(item, folder_path, name):
-    """Save request details to a TXT file"""
-    if 'request' not in item:
-        return
-        
-    request = item['request']
-    filename = f"{name}.txt"
-    filepath = os.path.join(folder_path, filename)
-    
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"API Endpoint: {name}\n")
-            f.write("=" * 50 + "\n")
-            f.write(f"Method: {request.get('method', 'N/A')}\n")
-            f.write(f"URL: {request.get('url', {}).get('raw', 'N/A')}\n\n")
-            
-            description = request.get('description', '').strip()
-            if description:
-                f.write("Description:\n")
-                f.write(description + "\n\n")
-                
-            # Headers
-            headers = request.get('header', [])
-            if headers:
-                f.write("Headers:\n")
-                for header in headers:
-                    key = header.get('key', '')
-                    value = header.get('value', '')
-                    f.write(f"  {key}: {value}\n")
-                f.write("\n")
-                
-            # Body (if present)
-            body = request.get('body')
-            if body:
-                f.write("Body:\n")
-                if body.get('mode') == 'raw':
-                    f.write(body.get('raw', '') + "\n")
-                f.write("\n")
-                
-        print(f"Saved TXT: {name}")
-    except Exception as e:
-        print(f"Error saving TXT {name}: {str(e)}")
-
-def save_request_json(item, folder_path, name):
-    """Save request details to a JSON file"""
-    filename = f"{name}.json"
-    filepath = os.path.join(folder_path, filename)
-    
-    try:
-        # Pretty print the entire item
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(item, f, indent=2, ensure_ascii=False)
-        print(f"Saved JSON: {name}")
-    except Exception as e:
-        print(f"Error saving JSON {name}: {str(e)}")
-
-def save_request_md(item, folder_path, name):
-    """Save request details to a Markdown file"""
-    if 'request' not in item:
-        return
-        
-    request = item['request']
-    filename = f"{name}.md"
-    filepath = os.path.join(folder_path, filename)
-    
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"# {name}\n\n")
-            f.write(f"**Method:** `{request.get('method', 'N/A')}`  \n")
-            f.write(f"**URL:** `{request.get('url', {}).get('raw', 'N/A')}`\n\n")
-            
-            description = request.get('description', '').strip()
-            if description:
-                f.write(f"## Description\n{description}\n\n")
-                
-            # Headers
-            headers = request.get('header', [])
-            if headers:
-                f.write("## Headers\n")
-                f.write("| Key | Value |\n|-----|-------|\n")
-                for header in headers:
-                    key = header.get('key', '')
-                    value = header.get('value', '')
-                    f.write(f"| {key} | {value} |\n")
-                f.write("\n")
-                
-            # Body (if present)
-            body = request.get('body')
-            if body:
-                f.write("## Body\n")
-                if body.get('mode') == 'raw':
-                    raw_body = body.get('raw', '')
-                    f.write("```json\n")
-                    f.write(raw_body + "\n")
-                    f.write("```\n")
-                f.write("\n")
-                
-        print(f"Saved MD: {name}")
-    except Exception as e:
-        print(f"Error saving MD {name}: {str(e)}")
-
-def process_item(item, current_path, format_type):
-    """Process a collection item (folder or request)"""
-    name = sanitize_name(item.get('name', 'unnamed'))
-    
-    if 'item' in item:
-        # This is a folder
-        folder_path = os.path.join(current_path, name)
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
-            print(f"Created folder: {name}")
-            
-        # Process children
-        for child in item['item']:
-            process_item(child, folder_path, format_type)
-    else:
-        # This is a request
-        # Save in the specified format only
-        if format_type == 'txt':
-            save_request_txt(item, current_path, name)
-        elif format_type == 'json':
-            save_request_json(item, current_path, name)
-        elif format_type == 'md':
-            save_request_md(item, current_path, name)
+from collection_watch import CollectionWatcher
+from content_store import LINK_MODES
+from conversion_shards import parse_shard
+# The converter itself lives in converter_core; these names are re-exported so
+# that code importing them from this script keeps working.
+from converter_core import (FORMATS, PRETTY_LIMIT, RENDERERS, BodyOptions, RequestRecord, as_formats,
+                            build_record, convert_collection, convert_to_archive, create_folder, iter_items,
+                            open_collection, process_item, render_documents, render_request_json,
+                            render_request_md, render_request_txt, sanitize_name, save_documents, save_request,
+                            save_request_json, save_request_md, save_request_txt, write_bundle, write_entries)
 
 def show_help():
     print("Postman Collection Converter (Single Format)")
-    print("Usage: python single_format_converter.py [collection_file] [output_dir] [format]")
+    print("Usage: python single_format_converter.py [collection_file] [output_dir] [format] [options]")
     print("")
     print("Arguments:")
     print("  collection_file  Path to the Postman collection JSON file (default: d:/printify_postman_collection.json)")
-    print("  output_dir       Output directory path (default: ./output)")
-    print("  format           Output format: txt, json, or md (default: txt)")
+    print("  output_dir       Output directory path (default: ./output), or - to write JSONL")
+    print("                   records to stdout (messages then go to stderr)")
+    print("  format           Output format: txt, json, or md (default: txt). Several formats")
+    print("                   can be given as a comma separated list, or 'all'")
+    print("")
+    print("Options:")
+    print("  --stream         Parse the collection incrementally to keep memory use flat")
+    print("  --jobs N         Write requests on N worker threads (default: 1)")
+    print("  --incremental    Only rewrite requests that changed since the last run")
+    print("  --prune          With --incremental, delete files whose request is gone")
+    print("  --archive TYPE   Write into a single zip, tar.gz or jsonl bundle instead of a")
+    print("                   folder tree (implied by an output_dir ending in that suffix)")
+    print("  --dry-run        List the folders and files that would be written, then exit")
+    print("  --stats          Print per-phase timings, counters and the slowest requests")
+    print("  --stats-json F   Also write those statistics as JSON to file F")
+    print("  --env F          Render once per Postman environment file F (repeatable), each")
+    print("                   into output_dir/<environment name>, with variables filled in")
+    print("  --variables      Fill in the collection's own variables")
+    print("  --max-body N     Save raw bodies longer than N characters (K and M suffixes")
+    print("                   allowed) to a <name>.body.json/.txt file next to the documents")
+    print("  --pretty-bodies  Pretty-print JSON bodies in TXT and Markdown output")
+    print("  --pretty-limit N Only pretty-print bodies up to N characters (default: 1M)")
+    print("  --single KIND    Write one md or html document with a table of contents instead of")
+    print("                   a file per request (to output_dir if it ends in .md/.html)")
+    print("  --dedup [MODE]   Store each distinct document once in output_dir/.converter_store")
+    print("                   and link the files to it: hard (default), symlink or copy")
+    print("  --shard I/N      Write only the I-th of N stable shares of the requests, for")
+    print("                   splitting a run across machines; check and combine the shards")
+    print("                   with: python conversion_shards.py output_dir [shard_dirs]")
+    print("  --atomic         Write into a staging folder next to the output and move it into")
+    print("                   place only when the whole conversion has finished")
+    print("  --resume         Continue an --atomic run that was interrupted, skipping the")
+    print("                   requests it had already written")
+    print("  --index F        Also build a SQLite full-text index of every request in file F;")
+    print("                   query it with: python search_index.py F <terms>")
+    print("  --watch          Keep running and rewrite only the requests that change when")
+    print("                   the collection file is saved again (Ctrl+C to stop)")
+    print("  --interval S     With --watch, seconds between checks of the file (default: 1)")
+    print("  --debounce S     With --watch, seconds the file must stay unchanged before a")
+    print("                   sync starts (default: 0.5)")
     print("")
     print("Examples:")
     print("  python single_format_converter.py")
     print("  python single_format_converter.py d:/my_collection.json")
     print("  python single_format_converter.py d:/my_collection.json ./api_docs md")
     print("  python single_format_converter.py d:/my_collection.json ./api_docs json")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs txt,md")
+    print("  python single_format_converter.py d:/huge_collection.json ./api_docs md --stream")
+    print("  python single_format_converter.py d:/huge_collection.json ./api_docs md --jobs 8")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs md --incremental --prune")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs.zip md")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs md --dry-run")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs md --stats")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs md --watch")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs md --index ./api_docs.db")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs md --env dev.json --env prod.json")
+    print("  python single_format_converter.py d:/my_collection.json - md > api_docs.jsonl")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs md --max-body 64K --pretty-bodies")
+    print("  python single_format_converter.py d:/my_collection.json ./reference.html --single html --stream")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs all --dedup")
+    print("  python single_format_converter.py d:/my_collection.json ./api_docs md --shard 2/4")
+    print("  python single_format_converter.py d:/huge_collection.json ./api_docs md --stream --resume")
 
-def convert_collection(collection_file, output_dir, format_type):
-    """Main conversion function"""
-    print(f"Converting '{collection_file}' to '{output_dir}'")
-    print(f"Format: {format_type} (single format only)")
-    print("-" * 50)
-    
-    # Load collection
+def parse_formats(format_arg):
+    """Parse a format argument: one format, a comma separated list or 'all'"""
+    format_arg = format_arg.lower()
+    requested = FORMATS if format_arg == 'all' else format_arg.split(',')
+    formats = []
+    for format_type in requested:
+        if format_type in FORMATS:
+            if format_type not in formats:
+                formats.append(format_type)
+        elif len(requested) > 1:
+            print(f"Warning: Unknown format '{format_type}', skipping it.")
+    if not formats:
+        print(f"Warning: Unknown format '{format_arg}', using 'txt' instead.")
+        formats = ["txt"]
+    return formats
+
+def parse_size(value):
+    """Parse a size such as 65536, 64K or 2M"""
+    value = value.strip().upper()
+    factor = {'K': 1024, 'M': 1024 * 1024}.get(value[-1:], 1)
+    if factor != 1:
+        value = value[:-1]
     try:
-        with open(collection_file, 'r', encoding='utf-8') as f:
-            collection = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: Collection file '{collection_file}' not found.")
-        return False
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in collection file: {str(e)}")
-        return False
-        
-    collection_name = collection.get('info', {}).get('name', 'PostmanCollection')
-    print(f"Loaded collection: {collection_name}")
-    
-    # Create main output directory
-    main_output_dir = os.path.join(output_dir, sanitize_name(collection_name))
-    Path(main_output_dir).mkdir(parents=True, exist_ok=True)
-    print(f"Created main directory: {os.path.basename(main_output_dir)}")
-        
-    # Process items
-    if 'item' in collection:
-        for item in collection['item']:
-            process_item(item, main_output_dir, format_type)
-            
-    print("-" * 50)
-    print("Conversion completed successfully!")
-    return True
+        return int(value) * factor
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: '{value}'") from None
+
+def parse_shard_arg(value):
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('collection_file', nargs='?', default="d:/printify_postman_collection.json")
+    parser.add_argument('output_dir', nargs='?', default="./output")
+    parser.add_argument('format', nargs='?', default="txt")
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--incremental', action='store_true')
+    parser.add_argument('--prune', action='store_true')
+    parser.add_argument('--archive', choices=['zip', 'tar.gz', 'jsonl'])
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--stats', '--profile', action='store_true')
+    parser.add_argument('--stats-json')
+    parser.add_argument('--max-body', type=parse_size)
+    parser.add_argument('--pretty-bodies', action='store_true')
+    parser.add_argument('--pretty-limit', type=parse_size, default=PRETTY_LIMIT)
+    parser.add_argument('--single', choices=['md', 'html'])
+    parser.add_argument('--dedup', nargs='?', const='hard', choices=LINK_MODES)
+    parser.add_argument('--shard', type=parse_shard_arg)
+    parser.add_argument('--atomic', action='store_true')
+    parser.add_argument('--resume', action='store_true')
+    parser.add_argument('--index')
+    parser.add_argument('--env', action='append', dest='environment_files')
+    parser.add_argument('--variables', action='store_true')
+    parser.add_argument('--watch', action='store_true')
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--debounce', type=float, default=0.5)
+    args = parser.parse_args(argv)
+    args.format = parse_formats(args.format)
+    args.body_options = None
+    if args.max_body is not None or args.pretty_bodies:
+        args.body_options = BodyOptions(args.max_body, args.pretty_bodies, args.pretty_limit)
+    return args
+
+def log_to_stderr(message):
+    print(message, file=sys.stderr)
 
 if __name__ == "__main__":
     # Check for help flag
@@ -190,27 +157,30 @@ if __name__ == "__main__":
         show_help()
         sys.exit(0)
     
-    # Default values
-    collection_file = "d:/printify_postman_collection.json"
-    output_dir = "./output"
-    format_type = "txt"  # Default to TXT format
+    args = parse_args(sys.argv[1:])
     
-    # Parse command line arguments
-    if len(sys.argv) > 1:
-        collection_file = sys.argv[1]
-        
-    if len(sys.argv) > 2:
-        output_dir = sys.argv[2]
-        
-    if len(sys.argv) > 3:
-        # Parse format argument
-        format_arg = sys.argv[3].lower()
-        if format_arg in ['txt', 'json', 'md']:
-            format_type = format_arg
-        else:
-            print(f"Warning: Unknown format '{format_arg}', using 'txt' instead.")
-            format_type = "txt"
+    if args.watch:
+        if (args.archive or args.dry_run or args.environment_files or args.variables or args.single or args.shard
+                or args.atomic or args.resume):
+            print("Error: --watch cannot be combined with --archive, --dry-run, --env, --variables, --single, "
+                  "--shard, --atomic or --resume.")
+            sys.exit(1)
+        watcher = CollectionWatcher(args.collection_file, args.output_dir, args.format,
+                                    interval=args.interval, debounce=args.debounce, jobs=args.jobs,
+                                    body_options=args.body_options, dedup=args.dedup)
+        watcher.watch()
+        sys.exit(0)
     
-    # Convert the collection
-    success = convert_collection(collection_file, output_dir, format_type)
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    # Convert the collection; with JSONL on stdout the messages go to stderr
+    log = print if args.output_dir != '-' else log_to_stderr
+    success = convert_collection(args.collection_file, args.output_dir, args.format,
+                                 stream=args.stream, jobs=args.jobs,
+                                 incremental=args.incremental, prune=args.prune,
+                                 archive=args.archive, dry_run=args.dry_run,
+                                 show_stats=args.stats, stats_json=args.stats_json,
+                                 index=args.index, environment_files=args.environment_files,
+                                 resolve_variables=args.variables, log=log,
+                                 body_options=args.body_options, single=args.single,
+                                 dedup=args.dedup, shard=args.shard, atomic=args.atomic,
+                                 resume=args.resume)
+    sys.exit(0 if success else 1)
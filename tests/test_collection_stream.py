@@ -0,0 +1,118 @@
+import io
+import json
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collection_stream import read_collection  # noqa: E402
+from converter_core import iter_items, iter_stream_items  # noqa: E402
+
+CHUNK_SIZES = [1, 2, 3, 7, 64]
+
+
+def random_value(rng, depth=0):
+    kind = rng.randrange(8 if depth < 3 else 6)
+    if kind == 0:
+        return rng.randint(-10 ** 12, 10 ** 12)
+    if kind == 1:
+        return rng.choice([1.5, -0.25, 1e-7, 1.5e10, 12345000000.0, rng.uniform(-1e6, 1e6)])
+    if kind == 2:
+        return rng.choice(["", "x", "a \"quoted\" \\ value", "café ☃", "line\nbreak", "{{baseUrl}}/r"])
+    if kind == 3:
+        return rng.choice([True, False, None])
+    if kind == 4:
+        return rng.choice([0, 1, 10, 0.5])
+    if kind == 5:
+        return "s" * rng.randrange(20)
+    if kind == 6:
+        return [random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f"k{i}": random_value(rng, depth + 1) for i in range(rng.randrange(4))}
+
+
+def random_request(rng, index):
+    item = {
+        'name': f"Req {index}",
+        'request': {
+            'method': rng.choice(['GET', 'POST']),
+            'url': {'raw': f"https://example.com/{index}", 'port': rng.choice([80, 8080])},
+            'header': [{'key': 'A', 'value': 'b'}],
+            'body': {'mode': 'raw', 'raw': json.dumps(random_value(rng))},
+        },
+        'extra': random_value(rng),
+    }
+    return _shuffled(rng, item)
+
+
+def random_items(rng, depth, counter):
+    items = []
+    for _ in range(rng.randrange(1, 4)):
+        counter[0] += 1
+        if depth < 3 and rng.random() < 0.4:
+            folder = {'name': f"Folder {counter[0]}", 'item': random_items(rng, depth + 1, counter),
+                      'weight': random_value(rng)}
+            items.append(_shuffled(rng, folder))
+        else:
+            items.append(random_request(rng, counter[0]))
+    return items
+
+
+def _shuffled(rng, obj):
+    keys = list(obj)
+    rng.shuffle(keys)
+    return {key: obj[key] for key in keys}
+
+
+def random_collection(rng):
+    collection = {
+        'zz': random_value(rng),
+        'info': {'name': f"Collection {rng.randrange(1000)}", 'version': random_value(rng)},
+        'item': random_items(rng, 0, [0]),
+        'variable': [{'key': 'baseUrl', 'value': random_value(rng)}],
+    }
+    return _shuffled(rng, collection)
+
+
+def _comparable(entries):
+    # Streamed folders are emitted once their name is known, without their
+    # children and without the fields that follow them; requests are whole
+    return [(kind, parents, name, item if kind == 'request' else None)
+            for kind, parents, name, item in entries]
+
+
+class ReadCollectionTest(unittest.TestCase):
+
+    def assert_same_as_json(self, text, chunk_size):
+        collection = json.loads(text)
+        expected_variables = collection.get('variable', [])
+        expected = _comparable(iter_items(collection.get('item', [])))
+
+        events = read_collection(io.StringIO(text), chunk_size=chunk_size)
+        kind, name = next(events)
+        variables = []
+        entries = _comparable(iter_stream_items(events, variables))
+
+        self.assertEqual(kind, 'collection')
+        self.assertEqual(name, collection.get('info', {}).get('name', 'PostmanCollection'))
+        self.assertEqual(entries, expected)
+        self.assertEqual(variables, expected_variables)
+
+    def test_number_cut_by_chunk_boundary(self):
+        text = '{"zz": 1.5e10, "info": {"name":"c"}, "item": []}'
+        for chunk_size in CHUNK_SIZES:
+            self.assert_same_as_json(text, chunk_size)
+
+    def test_random_collections_match_json_load(self):
+        rng = random.Random(1234)
+        for _ in range(300):
+            collection = random_collection(rng)
+            text = json.dumps(collection, indent=rng.choice([None, 1]), ensure_ascii=rng.random() < 0.5)
+            for chunk_size in CHUNK_SIZES:
+                with self.subTest(collection=text[:80], chunk_size=chunk_size):
+                    self.assert_same_as_json(text, chunk_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import builtins
+import errno
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversion_journal import JOURNAL_NAME, Journal, staging_path  # noqa: E402
+from converter_core import convert_collection  # noqa: E402
+
+
+def request(name, method='GET'):
+    return {'name': name, 'request': {'method': method, 'url': {'raw': f"https://example.com/{name}"}}}
+
+
+def collection(count, removed=()):
+    folders = [{'name': f"F{i}", 'item': [request(f"r{i}-{j}") for j in range(4) if (i, j) not in removed]}
+               for i in range(count)]
+    return {'info': {'name': 'API'}, 'item': folders}
+
+
+def tree(root):
+    """Return every file under root with its content, by relative path"""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def failing_open(after):
+    """An open() that fails with a full disk once `after` documents were written"""
+    written = [0]
+
+    def fake_open(path, mode='r', *args, **kwargs):
+        if 'w' in mode and str(path).endswith('.md'):
+            written[0] += 1
+            if written[0] > after:
+                raise OSError(errno.ENOSPC, "No space left on device")
+        return builtins.open(path, mode, *args, **kwargs)
+    return fake_open
+
+
+class JournalTest(unittest.TestCase):
+
+    def test_resume_skips_journaled_requests_unless_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, JOURNAL_NAME)
+            journal = Journal(path, ['md'])
+            journal.check(('F',), 'a', {'name': 'a'})({'md': True})
+            journal.check(('F',), 'b', {'name': 'b'})({'md': False})
+            journal.check(('F',), 'c', {'name': 'c'})({'md': None})
+            journal.close()
+
+            journal = Journal(path, ['md'], resume=True)
+            self.assertIsNone(journal.check(('F',), 'a', {'name': 'a'}))
+            self.assertIsNotNone(journal.check(('F',), 'b', {'name': 'b'}))
+            self.assertIsNone(journal.check(('F',), 'c', {'name': 'c'}))
+            self.assertIsNotNone(journal.check(('F',), 'a', {'name': 'a', 'changed': True}))
+            journal.close()
+            self.assertIsNotNone(Journal(path, ['md', 'txt'], resume=True).check(('F',), 'c', {'name': 'c'}))
+
+    def test_torn_last_line_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, JOURNAL_NAME)
+            journal = Journal(path, ['md'])
+            journal.check((), 'a', {'name': 'a'})({'md': True})
+            journal.close()
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write("0123")
+            self.assertEqual(list(Journal(path, ['md'], resume=True).done), ['a'])
+
+
+class AtomicConversionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def convert(self, data, output_dir, **options):
+        collection_file = os.path.join(self.tmp.name, 'collection.json')
+        with open(collection_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        lines = []
+        success = convert_collection(collection_file, os.path.join(self.tmp.name, output_dir), ['md'],
+                                     log=lines.append, **options)
+        return success, lines
+
+    def output(self, output_dir):
+        return os.path.join(self.tmp.name, output_dir)
+
+    def test_failed_writes_keep_previous_output_and_staging(self):
+        self.assertTrue(self.convert(collection(2), 'out', atomic=True)[0])
+        previous = tree(os.path.join(self.output('out'), 'API'))
+
+        with mock.patch('converter_core.open', failing_open(3), create=True):
+            success, lines = self.convert(collection(3), 'out', atomic=True)
+        self.assertFalse(success)
+        self.assertIn("Error: 9 requests could not be saved; the output was not moved into place. "
+                      "Run again with --resume to retry them.", lines)
+        self.assertEqual(tree(os.path.join(self.output('out'), 'API')), previous)
+        staging = staging_path(self.output('out'), 'API')
+        self.assertTrue(os.path.exists(os.path.join(staging, JOURNAL_NAME)))
+
+        success, lines = self.convert(collection(3), 'out', resume=True)
+        self.assertTrue(success)
+        self.assertIn("Journal: 9 requests written, 3 already written by an earlier run", lines)
+        self.assertFalse(os.path.exists(staging))
+        self.assertTrue(self.convert(collection(3), 'clean', atomic=True)[0])
+        self.assertEqual(tree(self.output('out')), tree(self.output('clean')))
+
+    def test_resume_removes_requests_gone_from_collection(self):
+        cancel = threading.Event()
+
+        def progress(done, total):
+            if done >= 10:
+                cancel.set()
+        success, _ = self.convert(collection(4), 'out', atomic=True, progress=progress, cancel=cancel)
+        self.assertFalse(success)
+
+        # r0-1 was written before the interruption; F3 lost its requests
+        smaller = collection(4, removed=[(0, 1)] + [(3, j) for j in range(4)])
+        success, lines = self.convert(smaller, 'out', resume=True)
+        self.assertTrue(success)
+        self.assertTrue(any(line.startswith("Removed ") for line in lines))
+        self.assertTrue(self.convert(smaller, 'clean', atomic=True)[0])
+        self.assertEqual(tree(self.output('out')), tree(self.output('clean')))
+        self.assertFalse(os.path.exists(os.path.join(self.output('out'), 'API', 'F0', 'r0-1.md')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from converter_core import BodyOptions, convert_collection  # noqa: E402
+
+LARGE_BODY = json.dumps({'data': 'x' * 200})
+
+
+def request(name, method='GET', body=None):
+    data = {'method': method, 'url': {'raw': f"https://example.com/{name}"}}
+    if body is not None:
+        data['body'] = {'mode': 'raw', 'raw': body}
+    return {'name': name, 'request': data}
+
+
+class IncrementalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output_dir = os.path.join(self.tmp.name, 'out')
+        self.root = os.path.join(self.output_dir, 'API')
+
+    def convert(self, items, formats=('md', 'txt'), **options):
+        collection_file = os.path.join(self.tmp.name, 'collection.json')
+        with open(collection_file, 'w', encoding='utf-8') as f:
+            json.dump({'info': {'name': 'API'}, 'item': items}, f)
+        lines = []
+        self.assertTrue(convert_collection(collection_file, self.output_dir, list(formats), incremental=True,
+                                           log=lines.append, **options))
+        return lines
+
+    def files(self):
+        return sorted(os.listdir(self.root))
+
+    def assertSummary(self, lines, summary):
+        self.assertIn(f"Files: {summary}", [line.split(' (')[0] for line in lines])
+
+    def test_counts_added_changed_unchanged_removed(self):
+        items = [request('a'), request('b'), request('c')]
+        self.assertSummary(self.convert(items), "6 added, 0 changed, 0 unchanged, 0 removed")
+        self.assertSummary(self.convert(items), "0 added, 0 changed, 6 unchanged, 0 removed")
+
+        items = [request('a'), request('b', method='POST'), request('d')]
+        self.assertSummary(self.convert(items), "2 added, 2 changed, 2 unchanged, 2 removed")
+        # Without prune the removed request's files stay on disk
+        self.assertIn('c.md', self.files())
+
+    def test_prune_deletes_files_of_removed_requests(self):
+        self.convert([request('a'), request('b')])
+        lines = self.convert([request('a')], prune=True)
+        self.assertIn("Removed: b.md", lines)
+        self.assertEqual(self.files(), ['.converter_manifest.json', 'a.md', 'a.txt'])
+
+    def test_changed_options_rewrite_files(self):
+        items = [request('a', method='POST', body=LARGE_BODY)]
+        self.convert(items)
+        lines = self.convert(items, body_options=BodyOptions(pretty=True))
+        self.assertSummary(lines, "0 added, 2 changed, 0 unchanged, 0 removed")
+
+    def test_prune_deletes_sidecars(self):
+        options = BodyOptions(max_inline=50)
+        items = [request('a', 'POST', LARGE_BODY), request('b', 'POST', LARGE_BODY), request('c', 'POST', LARGE_BODY)]
+        self.convert(items, formats=['md'], body_options=options)
+        self.assertIn('a.body.json', self.files())
+        self.assertSummary(self.convert(items, formats=['md'], body_options=options),
+                           "0 added, 0 changed, 6 unchanged, 0 removed")
+
+        # a is removed and b's body no longer needs a sidecar
+        items = [request('b', 'POST', '{}'), request('c', 'POST', LARGE_BODY)]
+        lines = self.convert(items, formats=['md'], body_options=options, prune=True)
+        self.assertIn("Removed: a.body.json", lines)
+        self.assertIn("Removed: b.body.json", lines)
+        self.assertEqual(self.files(), ['.converter_manifest.json', 'b.md', 'c.body.json', 'c.md'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversion_shards import manifest_name, merge_shards, parse_shard  # noqa: E402
+from converter_core import BodyOptions, convert_collection  # noqa: E402
+
+
+def request(name, method='GET'):
+    return {'name': name,
+            'request': {'method': method, 'url': {'raw': f"{{{{baseUrl}}}}/{name}"},
+                        'body': {'mode': 'raw', 'raw': json.dumps({'name': name, 'data': 'x' * 100})}}}
+
+
+def collection(method='GET'):
+    items = [{'name': f"F{i}", 'item': [request(f"r{i}-{j}", method) for j in range(5)]} for i in range(4)]
+    return {'info': {'name': 'API'}, 'item': items + [request('Top')]}
+
+
+def tree(root):
+    files = set()
+    for dirpath, _, filenames in os.walk(root):
+        files.update(os.path.relpath(os.path.join(dirpath, filename), root) for filename in filenames)
+    return files
+
+
+class ShardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, *parts):
+        return os.path.join(self.tmp.name, *parts)
+
+    def write_json(self, name, data):
+        with open(self.path(name), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        return self.path(name)
+
+    def run_shard(self, output_dir, shard, data=None, **options):
+        collection_file = self.write_json('collection.json', data or collection())
+        self.assertTrue(convert_collection(collection_file, self.path(output_dir), ['md', 'json'],
+                                           shard=parse_shard(shard), log=lambda line: None, **options))
+
+    def merge(self, *shard_dirs):
+        lines = []
+        success = merge_shards(self.path('merged'), [self.path(d) for d in shard_dirs], log=lines.append)
+        return success, lines
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('2/3'), (2, 3))
+        for value in ['0/3', '4/3', '1/0', 'x', '1/2/3']:
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_merged_shards_match_a_full_run(self):
+        for index in range(1, 4):
+            self.run_shard(f"s{index}", f"{index}/3")
+        success, lines = self.merge('s1', 's2', 's3')
+        self.assertTrue(success, lines)
+
+        collection_file = self.write_json('collection.json', collection())
+        self.assertTrue(convert_collection(collection_file, self.path('full'), ['md', 'json'], log=lambda line: None))
+        shard_manifests = {manifest_name((index, 3)) for index in range(1, 4)}
+        self.assertEqual(tree(self.path('merged')) - shard_manifests, tree(self.path('full')))
+
+    def test_shards_in_a_shared_directory_are_verified(self):
+        self.run_shard('shared', '1/2')
+        self.run_shard('shared', '2/2')
+        lines = []
+        self.assertTrue(merge_shards(self.path('shared'), log=lines.append), lines)
+
+    def test_missing_shard(self):
+        self.run_shard('s1', '1/3')
+        self.run_shard('s2', '2/3')
+        success, lines = self.merge('s1', 's2')
+        self.assertFalse(success)
+        self.assertIn("Error: Missing shards: 3 of 3", lines)
+
+    def assert_mismatch(self, **options):
+        self.run_shard('s1', '1/2', **options.pop('first', {}))
+        self.run_shard('s2', '2/2', **options)
+        success, lines = self.merge('s1', 's2')
+        self.assertFalse(success)
+        self.assertTrue(any("written from a different collection, shard count or options" in line
+                            for line in lines), lines)
+        self.assertFalse(os.path.exists(self.path('merged')))
+
+    def test_changed_collection_is_rejected(self):
+        self.assert_mismatch(data=collection(method='POST'))
+
+    def test_different_body_options_are_rejected(self):
+        self.assert_mismatch(body_options=BodyOptions(max_inline=50))
+
+    def test_different_dedup_mode_is_rejected(self):
+        self.assert_mismatch(dedup='copy')
+
+    def test_different_environment_values_are_rejected(self):
+        first = self.write_json('dev.json', {'name': 'dev', 'values': [{'key': 'baseUrl', 'value': 'https://a'}]})
+        os.mkdir(self.path('other'))
+        second = self.write_json(os.path.join('other', 'dev.json'),
+                                 {'name': 'dev', 'values': [{'key': 'baseUrl', 'value': 'https://b'}]})
+        self.assert_mismatch(first={'environment_files': [first]}, environment_files=[second])
+
+
+if __name__ == '__main__':
+    unittest.main()
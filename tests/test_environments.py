@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from converter_core import convert_collection  # noqa: E402
+from environments import Environment, compile_template, render_value  # noqa: E402
+
+
+def render(text, variables):
+    missing = set()
+    return render_value(compile_template(text), variables, missing), missing
+
+
+class TemplateTest(unittest.TestCase):
+
+    def test_render(self):
+        self.assertEqual(render("{{ base }}/users/{{id}}", {'base': 'https://a', 'id': '7'}),
+                         ("https://a/users/7", set()))
+        self.assertEqual(render("{{base}}/{{id}}", {'base': 'https://a'}), ("https://a/{{id}}", {'id'}))
+        self.assertEqual(render("no variables", {}), ("no variables", set()))
+
+    def test_bind_resolves_nested_variables_and_environment_wins(self):
+        environment = Environment('dev', {'base': 'https://{{host}}', 'host': 'dev.example.com'})
+        environment.bind({'host': 'example.com', 'version': 'v1'})
+        self.assertEqual(environment.variables,
+                         {'base': 'https://dev.example.com', 'host': 'dev.example.com', 'version': 'v1'})
+
+    def test_digest_covers_values(self):
+        first, second = Environment('dev', {'a': '1'}), Environment('dev', {'a': '2'})
+        self.assertNotEqual(first.digest(), second.digest())
+        self.assertEqual(first.digest(), Environment('dev', {'a': '1'}).digest())
+
+
+class EnvironmentOutputTest(unittest.TestCase):
+
+    def test_json_copy_is_rendered(self):
+        item = {'name': 'r', 'request': {
+            'method': 'POST',
+            'url': {'raw': '{{base}}/r', 'host': ['{{base}}']},
+            'header': [{'key': 'Authorization', 'value': 'Bearer {{tok}}'}],
+            'body': {'mode': 'urlencoded', 'urlencoded': [
+                {'key': 'off', 'value': '{{tok}}', 'disabled': True},
+                {'key': 'k', 'value': '{{tok}}'},
+                {'key': 'f', 'src': '{{tok}}.bin', 'type': 'file'},
+            ]},
+        }}
+        with tempfile.TemporaryDirectory() as tmp:
+            collection_file = os.path.join(tmp, 'collection.json')
+            with open(collection_file, 'w', encoding='utf-8') as f:
+                json.dump({'info': {'name': 'API'}, 'item': [item]}, f)
+            environment_file = os.path.join(tmp, 'dev.json')
+            with open(environment_file, 'w', encoding='utf-8') as f:
+                json.dump({'name': 'dev', 'values': [{'key': 'base', 'value': 'https://a'},
+                                                     {'key': 'tok', 'value': 'SECRET'}]}, f)
+            self.assertTrue(convert_collection(collection_file, os.path.join(tmp, 'out'), ['json', 'txt'],
+                                               environment_files=[environment_file], log=lambda line: None))
+            with open(os.path.join(tmp, 'out', 'dev', 'API', 'r.json'), 'r', encoding='utf-8') as f:
+                request = json.load(f)['request']
+            with open(os.path.join(tmp, 'out', 'dev', 'API', 'r.txt'), 'r', encoding='utf-8') as f:
+                text = f.read()
+
+        self.assertEqual(request['url'], {'raw': 'https://a/r', 'host': ['{{base}}']})
+        self.assertEqual(request['header'], [{'key': 'Authorization', 'value': 'Bearer SECRET'}])
+        self.assertEqual(request['body']['urlencoded'], [
+            {'key': 'off', 'value': '{{tok}}', 'disabled': True},
+            {'key': 'k', 'value': 'SECRET'},
+            {'key': 'f', 'src': 'SECRET.bin', 'type': 'file'},
+        ])
+        self.assertIn("k: SECRET", text)
+        # The source item is not changed by rendering
+        self.assertEqual(item['request']['url']['raw'], '{{base}}/r')
+
+
+if __name__ == '__main__':
+    unittest.main()
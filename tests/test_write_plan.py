@@ -0,0 +1,62 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from converter_core import SIDECAR_FORMATS, iter_items  # noqa: E402
+from write_plan import compile_plan  # noqa: E402
+
+
+def request(name):
+    return {'name': name, 'request': {'method': 'GET', 'url': {'raw': 'https://example.com'}}}
+
+
+def folder(name, *items):
+    return {'name': name, 'item': list(items)}
+
+
+class CompilePlanTest(unittest.TestCase):
+
+    def plan(self, items, formats=('md',), sidecars=()):
+        return compile_plan(iter_items(items), list(formats), sidecars)
+
+    def test_duplicate_requests_get_numbered_in_input_order(self):
+        plan = self.plan([request('Get'), request('Get'), request('Get')])
+        self.assertEqual(plan.requests, [((), 'Get'), ((), 'Get_2'), ((), 'Get_3')])
+        self.assertEqual(plan.collisions, [('Get', 'Get_2'), ('Get', 'Get_3')])
+
+    def test_names_collide_case_insensitively_and_after_sanitizing(self):
+        plan = self.plan([request('Get User'), request('get user'), request('a/b'), request('a?b')])
+        self.assertEqual([name for _, name in plan.requests], ['Get User', 'get user_2', 'a_b', 'a_b_2'])
+
+    def test_sibling_folders_are_merged(self):
+        plan = self.plan([folder('F', request('a')), folder('f', request('a'))])
+        self.assertEqual(plan.folders, [('F',)])
+        self.assertEqual(plan.requests, [(('F',), 'a'), (('F',), 'a_2')])
+
+    def test_request_and_folder_with_the_same_name(self):
+        plan = self.plan([folder('X', request('a')), request('X')], formats=['md'])
+        # X.md does not clash with the folder X
+        self.assertEqual(plan.requests, [(('X',), 'a'), ((), 'X')])
+        plan = self.plan([request('X'), folder('X.md', request('a'))])
+        self.assertEqual(plan.folders, [('X.md_2',)])
+
+    def test_reserved_names(self):
+        plan = self.plan([request(''), request('..')])
+        self.assertEqual([name for _, name in plan.requests], ['unnamed', 'unnamed_2'])
+
+    def test_sidecar_names_are_reserved(self):
+        items = [request('X'), request('X.body')]
+        self.assertEqual([name for _, name in self.plan(items, ['json']).requests], ['X', 'X.body'])
+        plan = self.plan(items, ['json'], SIDECAR_FORMATS)
+        self.assertEqual([name for _, name in plan.requests], ['X', 'X.body_2'])
+        self.assertEqual(plan.paths(), ['X.body_2.json', 'X.json'])
+
+    def test_paths_cover_every_format(self):
+        plan = self.plan([folder('F', request('a'))], formats=['md', 'txt'])
+        self.assertEqual(plan.paths(), ['F/', 'F/a.md', 'F/a.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+
+# Names that cannot be used as a file or folder name on their own
+RESERVED_NAMES = {'', '.', '..'}
+
+
+def _path(parts):
+    return '/'.join(parts)
+
+
+class WritePlanner:
+    """Assign every folder and request a unique output path, one entry at a time
+
+    Names are compared case-insensitively so the result is safe on Windows
+    and macOS as well. Sibling folders with the same name are merged, as the
+    converter has always done. A request whose name is already used in its
+    folder gets a numeric suffix (`name_2`, `name_3`, ...) in input order,
+    so the result is deterministic. Every rename is recorded in collisions.
+    The names of sidecars, other files saved next to a request's documents,
+    are reserved along with them.
+    """
+
+    def __init__(self, formats, sidecars=()):
+        self.suffixes = [f".{format_type}" for format_type in list(formats) + list(sidecars)]
+        self.folders = {(): ()}  # source folder path -> planned folder path
+        self.names = {}          # planned folder path -> {casefolded name: (kind, name)}
+        self.collisions = []
+
+    def _free_name(self, taken, base, suffixes):
+        candidate = base
+        counter = 1
+        while any((candidate + suffix).casefold() in taken for suffix in suffixes):
+            counter += 1
+            candidate = f"{base}_{counter}"
+        return candidate
+
+    def resolve(self, kind, parents, name):
+        """Return (planned parents, planned name, is_new_folder) for an entry"""
+        parent = self.folders[parents]
+        taken = self.names.setdefault(parent, {})
+        base = 'unnamed' if name in RESERVED_NAMES else name
+        new_folder = False
+
+        if kind == 'folder':
+            existing = taken.get(base.casefold())
+            if existing is not None and existing[0] == 'folder':
+                planned = existing[1]
+            else:
+                planned = self._free_name(taken, base, [''])
+                taken[planned.casefold()] = ('folder', planned)
+                new_folder = True
+            self.folders[parents + (name,)] = parent + (planned,)
+        else:
+            planned = self._free_name(taken, base, self.suffixes)
+            for suffix in self.suffixes:
+                taken[(planned + suffix).casefold()] = ('file', planned + suffix)
+
+        if planned != name:
+            self.collisions.append((_path(parents + (name,)), _path(parent + (planned,))))
+        return parent, planned, new_folder
+
+    def plan_entries(self, entries):
+        """Pass entries through with their planned parents and names"""
+        for kind, parents, name, item in entries:
+            parents, name, _ = self.resolve(kind, parents, name)
+            yield kind, parents, name, item
+
+
+class WritePlan:
+    """Every folder and file a conversion will create, computed up front
+
+    Only the planned paths are kept, not the source items, so a plan for a
+    streamed collection stays small. apply() pairs a second pass over the
+    same entries with the planned paths.
+    """
+
+    def __init__(self, formats):
+        self.formats = list(formats)
+        self.folders = []
+        self.requests = []
+        self.collisions = []
+
+    def create_directories(self, root_dir, log=print):
+        """Create every planned folder in one batch, parents first
+
+        Returns the number of folders that did not exist yet. Folders that
+        appear meanwhile, for example because another shard created them in
+        a shared output directory, are taken as they are.
+        """
+        created = 0
+        for folder in self.folders:
+            folder_path = os.path.join(root_dir, *folder)
+            try:
+                os.makedirs(folder_path)
+            except FileExistsError:
+                continue
+            log(f"Created folder: {folder[-1]}")
+            created += 1
+        return created
+
+    def apply(self, entries):
+        """Yield the request entries of a second pass with their planned paths"""
+        planned = iter(self.requests)
+        for kind, _, _, item in entries:
+            if kind != 'request':
+                continue
+            try:
+                parents, name = next(planned)
+            except StopIteration:
+                raise ValueError("Collection changed while it was being converted") from None
+            yield kind, parents, name, item
+        if next(planned, None) is not None:
+            raise ValueError("Collection changed while it was being converted")
+
+    def paths(self):
+        """Return every planned folder and file path, sorted"""
+        paths = [_path(folder) + '/' for folder in self.folders]
+        for parents, name in self.requests:
+            for format_type in self.formats:
+                paths.append(_path(parents + (f"{name}.{format_type}",)))
+        return sorted(paths)
+
+    def summary(self):
+        return (f"Plan: {len(self.folders)} folders, {len(self.requests) * len(self.formats)} files, "
+                f"{len(self.collisions)} name collisions resolved")
+
+
+def compile_plan(entries, formats, sidecars=()):
+    """Walk the entries once and return the WritePlan for them"""
+    planner = WritePlanner(formats, sidecars)
+    plan = WritePlan(formats)
+    for kind, parents, name, _ in entries:
+        parents, name, new_folder = planner.resolve(kind, parents, name)
+        if kind == 'folder':
+            if new_folder:
+                plan.folders.append(parents + (name,))
+        else:
+            plan.requests.append((parents, name))
+    plan.collisions = planner.collisions
+    return plan